@@ -1,16 +1,36 @@
-from flask import Flask , render_template
+import hashlib
+
+from flask import Flask, make_response, render_template, request
 
 app = Flask(__name__)
 
+# The pages have no template variables, so render them once at startup
+with app.app_context():
+    HOME_HTML = render_template('home.html')
+    LOGRUN_HTML = render_template('logrun.html')
+    STATS_HTML = render_template('viewstats.html')
+
+_ETAGS = {
+    html: hashlib.sha1(html.encode("utf-8")).hexdigest()
+    for html in (HOME_HTML, LOGRUN_HTML, STATS_HTML)
+}
+
+
+def _cached_page(html):
+    resp = make_response(html)
+    resp.set_etag(_ETAGS[html])
+    resp.headers["Cache-Control"] = "public, max-age=300"
+    return resp.make_conditional(request)
+
 @app.route("/")
 @app.route("/home")
 def home():
-    return render_template('home.html')
+    return _cached_page(HOME_HTML)
 
 @app.route("/logrun")
 def log_run():
-    return render_template('logrun.html')
+    return _cached_page(LOGRUN_HTML)
 
 @app.route("/viewstats")
 def view_stats():
-    return render_template('viewstats.html')
\ No newline at end of file
+    return _cached_page(STATS_HTML)
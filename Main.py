@@ -1,7 +1,18 @@
-import uuid
+import array
+import itertools
+import secrets
+import time
+from collections.abc import Sequence
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 
+import numpy as np
+
+_ONE_US = timedelta(microseconds=1)
+
 class User:
+    __slots__ = ()
+
     def login(self, username, password):
         pass
 
@@ -15,15 +26,26 @@ class User:
         pass
 
 class RunMetric:
+    __slots__ = ("distance", "start_time", "end_time", "_duration_us")
+
     def __init__(self, distance, duration=None, start_time=None, end_time=None):
         self.distance = float(distance)
         self.start_time = start_time
         self.end_time = end_time
-        if duration is None and start_time is not None and end_time is not None:
-            duration = end_time - start_time
-        if isinstance(duration, (int, float)):
-            duration = timedelta(seconds=duration)
-        self.duration = duration if duration is not None else timedelta() 
+        # Canonical duration is an int microsecond count; timedelta is built on read
+        if duration is None:
+            if start_time is not None and end_time is not None:
+                self._duration_us = (end_time - start_time) // _ONE_US
+            else:
+                self._duration_us = 0
+        elif isinstance(duration, timedelta):
+            self._duration_us = duration // _ONE_US
+        else:
+            self._duration_us = round(duration * 1_000_000)
+
+    @property
+    def duration(self):
+        return timedelta(microseconds=self._duration_us)
 
     def __repr__(self):  # This is a magic method that is used to represent the object as a string
         return (
@@ -31,81 +53,231 @@ class RunMetric:
             f"start_time={self.start_time}, end_time={self.end_time})"
         )
 
-class runnerSession:
-    """Encapsulates a single run session for a runner."""
+@dataclass(slots=True, frozen=True)
+class SessionSummary:
+    session_id: str
+    started_at: datetime
+    ended_at: datetime
+    total_distance: float
+    total_duration: timedelta
+
+    def __getitem__(self, key):
+        # Keeps summary["session_id"]-style access working for existing callers
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def as_dict(self):
+        # JSON-ready form for anything that serialises a summary: the duration
+        # is given in seconds and the datetimes as ISO-8601 strings
+        return {
+            "session_id": self.session_id,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "ended_at": self.ended_at.isoformat() if self.ended_at else None,
+            "total_distance": self.total_distance,
+            "total_duration": self.total_duration.total_seconds(),
+        }
+
+class _MetricSamples(Sequence):
+    """
+    List-like view of a session's samples. len() reads the column store
+    directly; indexing and iteration build RunMetric objects on demand.
+    """
+
+    __slots__ = ("_session",)
+
+    def __init__(self, session):
+        self._session = session
+
+    def __len__(self):
+        return len(self._session._distances)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        s = self._session
+        return RunMetric(
+            s._distances[index],
+            duration=timedelta(microseconds=s._durations_us[index]),
+            start_time=s._start_times[index],
+            end_time=s._end_times[index],
+        )
+
+    def append(self, metric):
+        # Like list.append on the old metrics list: stores the sample, while
+        # the running totals stay record_metric's job
+        self._session._append_sample(metric)
+
+    def __repr__(self):
+        return repr(list(self))
+
+class _Session:
+    """Encapsulates a single run session; subclasses only set the role label."""
+
+    __slots__ = (
+        "sessionId", "startTime", "endTime", "totalDistance",
+        "_total_us", "_begin_perf_ns", "_distances", "_durations_us",
+        "_start_times", "_end_times",
+    )
+    role_label = "Session"
 
     def __init__(self, sessionId):
         self.sessionId = sessionId
         self.startTime = None
         self.endTime = None
         self.totalDistance = 0.0
-        self.totalDuration = timedelta()
-        self.metrics = []
-
-    def begin(self):
+        self._total_us = 0
+        self._begin_perf_ns = None
+        # Samples are kept column-wise (distance km / duration us, plus the
+        # optional start/end datetimes) rather than as a list of RunMetric
+        # objects.
+        self._distances = array.array("d")
+        self._durations_us = array.array("q")
+        self._start_times = []
+        self._end_times = []
+
+    @property
+    def totalDuration(self):
+        return timedelta(microseconds=self._total_us)
+
+    @property
+    def metrics(self):
+        return _MetricSamples(self)
+
+    def _append_sample(self, metric):
+        self._distances.append(metric.distance)
+        self._durations_us.append(metric._duration_us)
+        self._start_times.append(metric.start_time)
+        self._end_times.append(metric.end_time)
+
+    def begin(self, now=None):
+        # `now` lets a caller that already holds a timestamp reuse it
         if self.startTime is not None:
             raise RuntimeError("Session already started")
-        self.startTime = datetime.now()
-        print(f"Runner session {self.sessionId} started at {self.startTime}")
+        self.startTime = now if now is not None else datetime.now()
+        # The monotonic reading is only used for sessions on the real clock
+        self._begin_perf_ns = time.perf_counter_ns() if now is None else None
+        print(f"{self.role_label} session {self.sessionId} started at {self.startTime}")
+
+    def _record_metric_unchecked(self, metric):
+        # Hot path: callers guarantee `metric` is a RunMetric
+        if self.startTime is None:
+            self.begin()
+        self._append_sample(metric)
+        self.totalDistance += metric.distance
+        self._total_us += metric._duration_us
+        return self.totalDistance, self.totalDuration
 
     def record_metric(self, metric):
         if not isinstance(metric, RunMetric):
             raise TypeError("metric must be an instance of RunMetric")
+        return self._record_metric_unchecked(metric)
+
+    record_metric_checked = record_metric
+
+    def record_metrics_bulk(self, distances, durations_s, keep_objects=False):
+        # Batch version of record_metric: the totals are two NumPy reductions
+        # instead of one Python-level add per sample. Durations are rounded to
+        # whole microseconds, as RunMetric does for a single sample.
+        # Without keep_objects the batch is totals-only: totalDistance and
+        # totalDuration grow, but the samples are not added to `metrics`.
+        d = np.asarray(distances, dtype=np.float64)
+        us = np.rint(np.asarray(durations_s, dtype=np.float64) * 1_000_000).astype(np.int64)
+        if d.shape != us.shape or d.ndim != 1:
+            raise ValueError("distances and durations_s must be 1-D arrays of equal length")
         if self.startTime is None:
             self.begin()
-        self.metrics.append(metric)
-        self.totalDistance += metric.distance
-        self.totalDuration += metric.duration
+        if keep_objects:
+            self._distances.frombytes(d.tobytes())
+            self._durations_us.frombytes(us.tobytes())
+            self._start_times.extend([None] * len(d))
+            self._end_times.extend([None] * len(d))
+        self.totalDistance += float(d.sum())
+        self._total_us += int(us.sum())
         return self.totalDistance, self.totalDuration
 
-    def finish(self):
+    def finish(self, now=None):
         if self.startTime is None:
             raise RuntimeError("Session was never started")
+        clock_supplied = now is not None or self.endTime is not None
         if self.endTime is None:
-            self.endTime = datetime.now()
-        print(f"Runner session {self.sessionId} ended at {self.endTime}")
+            self.endTime = now if now is not None else datetime.now()
+        if self._total_us == 0:
+            # No samples recorded: fall back to the time the session ran. A
+            # supplied clock (either `now`, or an endTime already set) is
+            # authoritative; perf_counter_ns is only used when begin() and
+            # finish() both read the real clock.
+            if clock_supplied or self._begin_perf_ns is None:
+                self._total_us = (self.endTime - self.startTime) // _ONE_US
+            else:
+                self._total_us = (time.perf_counter_ns() - self._begin_perf_ns) // 1000
+        print(f"{self.role_label} session {self.sessionId} ended at {self.endTime}")
         summary = self.summary()
         self.reset()
         return summary
 
     def summary(self):
-        effective_duration = self.totalDuration
-        if effective_duration == timedelta() and self.startTime and self.endTime:
-            effective_duration = self.endTime - self.startTime
-        return {
-            "session_id": self.sessionId,
-            "started_at": self.startTime,
-            "ended_at": self.endTime,
-            "total_distance": self.totalDistance,
-            "total_duration": effective_duration,
-        } # This is a dictionary that is used to return the summary of the session in JSON
+        return SessionSummary(
+            session_id=self.sessionId,
+            started_at=self.startTime,
+            ended_at=self.endTime,
+            total_distance=self.totalDistance,
+            total_duration=self.totalDuration,
+        )
 
     def reset(self):
         self.startTime = None
         self.endTime = None
         self.totalDistance = 0.0
-        self.totalDuration = timedelta()
-        self.metrics.clear()
+        self._total_us = 0
+        self._begin_perf_ns = None
+        del self._distances[:]
+        del self._durations_us[:]
+        self._start_times.clear()
+        self._end_times.clear()
+
+
+class runnerSession(_Session):
+    """Encapsulates a single run session for a runner."""
+
+    __slots__ = ()
+    role_label = "Runner"
+
+
+class coachSession(_Session):
+    __slots__ = ()
+    role_label = "Coach"
 
 class Runner(User):
+    __slots__ = (
+        "name", "currentGoal", "session_factory", "currentSession", "sessionHistory",
+        "_banner_login", "_banner_logout", "_banner_history", "_banner_role",
+    )
+
     def __init__(self, name, session_factory=None):
         self.name = name
         self.currentGoal = "No goal set"
         self.session_factory = session_factory or RunnerSessionFactory()
         self.currentSession = None
         self.sessionHistory = []
+        # The name is fixed for the object's lifetime, so build the banners once
+        self._banner_login = f"{name} (Runner) logged in as "
+        self._banner_logout = f"{name} logged out."
+        self._banner_history = f"Showing run history for {name}"
+        self._banner_role = f"I am a Runner, name: {name}"
 
     def login(self, username, password):
-        print(f"{self.name} (Runner) logged in as {username}")
+        print(self._banner_login + username)
 
     def logout(self):
-        print(f"{self.name} logged out.")
+        print(self._banner_logout)
 
     def viewHistory(self):
-        print(f"Showing run history for {self.name}")
+        print(self._banner_history)
 
     def showRole(self):
-        print(f"I am a Runner, name: {self.name}")
+        print(self._banner_role)
 
     def startRun(self):
         if self.currentSession is not None:
@@ -119,7 +291,7 @@ class Runner(User):
         if self.currentSession is None:
             raise RuntimeError("No active session to record metrics")
         metric = RunMetric(distance, duration=duration, start_time=start_time, end_time=end_time) # This is a class that is used to record the metric of the session
-        return self.currentSession.record_metric(metric) # This is a method that is used to record the metric of the session
+        return self.currentSession._record_metric_unchecked(metric) # This is a method that is used to record the metric of the session
 
     def endRun(self):
         if self.currentSession is None:
@@ -135,78 +307,34 @@ class Runner(User):
 
     def getSessionHistory(self):
         return list(self.sessionHistory)
-class coachSession:
-    def __init__(self, sessionId):
-        self.sessionId = sessionId
-        self.startTime = None
-        self.endTime = None
-        self.totalDistance = 0.0
-        self.totalDuration = timedelta()
-        self.metrics = []
-
-    def begin(self):
-        if self.startTime is not None:
-            raise RuntimeError("Session already started")
-        self.startTime = datetime.now()
-        print(f"Coach session {self.sessionId} started at {self.startTime}")
-
-    def record_metric(self, metric):
-        if not isinstance(metric, RunMetric):
-            raise TypeError("metric must be an instance of RunMetric")
-        if self.startTime is None:
-            self.begin()
-        self.metrics.append(metric)
-        self.totalDistance += metric.distance
-        self.totalDuration += metric.duration
-        return self.totalDistance, self.totalDuration
-
-    def finish(self):
-        if self.startTime is None:
-            raise RuntimeError("Session was never started")
-        if self.endTime is None:
-            self.endTime = datetime.now()
-        print(f"Coach session {self.sessionId} ended at {self.endTime}")
-        summary = self.summary()
-        self.reset()
-        return summary
-
-    def summary(self):
-        effective_duration = self.totalDuration
-        if effective_duration == timedelta() and self.startTime and self.endTime:
-            effective_duration = self.endTime - self.startTime
-        return {
-            "session_id": self.sessionId,
-            "started_at": self.startTime,
-            "ended_at": self.endTime,
-            "total_distance": self.totalDistance,
-            "total_duration": effective_duration,
-        } # This is a dictionary that is used to return the summary of the session in JSON
-
-    def reset(self):
-        self.startTime = None
-        self.endTime = None
-        self.totalDistance = 0.0
-        self.totalDuration = timedelta()
-        self.metrics.clear()
-
 class Coach(User):
+    __slots__ = (
+        "name", "session_factory", "currentSession", "sessionHistory",
+        "_banner_login", "_banner_logout", "_banner_history", "_banner_role",
+    )
+
     def __init__(self, name, session_factory=None):
         self.name = name
         self.session_factory = session_factory or CoachSessionFactory()
         self.currentSession = None
         self.sessionHistory = []
+        # The name is fixed for the object's lifetime, so build the banners once
+        self._banner_login = f"{name} (Coach) logged in as "
+        self._banner_logout = f"{name} logged out."
+        self._banner_history = f"Showing coach activity for {name}"
+        self._banner_role = f"I am a Coach, name: {name}"
 
     def login(self, username, password):
-        print(f"{self.name} (Coach) logged in as {username}")
+        print(self._banner_login + username)
 
     def logout(self):
-        print(f"{self.name} logged out.")
+        print(self._banner_logout)
 
     def viewHistory(self):
-        print(f"Showing coach activity for {self.name}")
+        print(self._banner_history)
 
     def showRole(self):
-        print(f"I am a Coach, name: {self.name}")
+        print(self._banner_role)
 
     def viewAthleteDashboard(self, runnerName):
         print(f"{self.name} is viewing dashboard of {runnerName}")
@@ -216,15 +344,25 @@ class Coach(User):
         print(f"{self.name} assigned '{workout.name()}' to {runnerName}")
         #need to implement the logic to assign the workout to the runner and reflect on the dashboard of the runner.
 
-class RunnerSessionFactory:
-    def create_session(self):
-        session_id = uuid.uuid4().hex
-        return runnerSession(session_id)
+class _SessionFactory:
+    """Issues session ids from a per-factory random prefix plus a counter."""
+
+    session_class = _Session
+
+    def __init__(self):
+        self._prefix = secrets.token_hex(4)
+        self._counter = itertools.count()
 
-class CoachSessionFactory:
     def create_session(self):
-        session_id = uuid.uuid4().hex
-        return coachSession(session_id)
+        session_id = f"{self._prefix}{next(self._counter):012x}"
+        return self.session_class(session_id)
+
+
+class RunnerSessionFactory(_SessionFactory):
+    session_class = runnerSession
+
+class CoachSessionFactory(_SessionFactory):
+    session_class = coachSession
 
 class UserFactory:
     def __init__(self, session_factory=None, coach_session_factory=None):
@@ -232,12 +370,15 @@ class UserFactory:
         self.coach_session_factory = (
             coach_session_factory or session_factory or CoachSessionFactory()
         )
+        self._builders = {
+            "runner": lambda name: Runner(name, session_factory=self.runner_session_factory),
+            "coach": lambda name: Coach(name, session_factory=self.coach_session_factory),
+        }
 
     def create_user(self, role, name):
         role = role.lower()
-        if role == "runner":
-            return Runner(name, session_factory=self.runner_session_factory)
-        if role == "coach":
-            return Coach(name, session_factory=self.coach_session_factory)
-
-        raise ValueError(f"Unsupported role: {role}")
+        try:
+            builder = self._builders[role]
+        except KeyError:
+            raise ValueError(f"Unsupported role: {role}") from None
+        return builder(name)
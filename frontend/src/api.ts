@@ -184,6 +184,8 @@ export interface AiPlanPreviewResponse {
     fitness_level?: string;
   };
   weekly_template: AiPlanPreviewDay[];
+  // Echo back unchanged with weekly_template to skip re-validation on apply
+  signature?: string;
 }
 
 export interface AiPlanApplyRequestDay {
@@ -195,6 +197,7 @@ export interface AiPlanApplyRequest {
   weekly_template: AiPlanApplyRequestDay[];
   start_date?: string; // "YYYY-MM-DD"
   days?: number;
+  signature?: string;
 }
 
 
@@ -230,16 +233,12 @@ export interface StravaStatusResponse {
   last_sync_cursor?: number | null;
   expires_at?: number | null;
   access_token_valid?: boolean;
+  sync_in_progress?: boolean;
 }
 
 export interface StravaSyncResponse {
+  status: "queued" | "already_running";
   user_id: string;
-  athlete_id?: number | null;
-  imported_sessions: number;
-  skipped_activities: number;
-  last_sync_cursor?: number | null;
-  last_activity_at?: string | null;
-  synced_at?: string | null;
 }
 
 // -------- Recent runs --------
@@ -332,6 +331,60 @@ async function request<T>(path: string, options: RequestInit = {}): Promise<T> {
   return (await resp.json()) as T;
 }
 
+/**
+ * Fetch an NDJSON endpoint and parse it line by line as the body arrives.
+ * `onRow` sees each row as soon as its line is complete; the full list is
+ * returned once the stream ends.
+ */
+async function requestNdjson<T>(
+  path: string,
+  onRow?: (row: T) => void
+): Promise<T[]> {
+  const resp = await fetch(`${API_BASE}${path}`);
+  if (!resp.ok) {
+    let detail = `HTTP ${resp.status}`;
+    try {
+      const data = await resp.json();
+      if (data && (data as any).detail) {
+        detail = JSON.stringify((data as any).detail);
+      }
+    } catch {
+      // ignore parse error
+    }
+    throw new Error(detail);
+  }
+
+  const rows: T[] = [];
+  const pushLine = (line: string) => {
+    if (!line.trim()) return;
+    const row = JSON.parse(line) as T;
+    rows.push(row);
+    onRow?.(row);
+  };
+
+  if (!resp.body) {
+    // No readable stream (very old runtimes): parse the whole body at once
+    (await resp.text()).split("\n").forEach(pushLine);
+    return rows;
+  }
+
+  const reader = resp.body.getReader();
+  const decoder = new TextDecoder();
+  let buffered = "";
+  for (;;) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffered += decoder.decode(value, { stream: true });
+    const lines = buffered.split("\n");
+    // The last piece may be a partial line; keep it for the next chunk
+    buffered = lines.pop() ?? "";
+    lines.forEach(pushLine);
+  }
+  buffered += decoder.decode();
+  pushLine(buffered);
+  return rows;
+}
+
 // =====================================
 // Auth
 // =====================================
@@ -654,7 +707,14 @@ export async function fetchStravaRunDetail(
   userId: string,
   activityId: number
 ): Promise<StravaRunDetail> {
-  return request<StravaRunDetail>(
-    `/api/strava/run/${userId}/${activityId}`
-  );
+  // The pace/cadence series is streamed from its own NDJSON endpoint
+  const [detail, series] = await Promise.all([
+    request<Omit<StravaRunDetail, "pace_cadence_series">>(
+      `/api/strava/run/${userId}/${activityId}`
+    ),
+    requestNdjson<StravaRunDetail["pace_cadence_series"][number]>(
+      `/api/strava/run/${userId}/${activityId}/series`
+    ),
+  ]);
+  return { ...detail, pace_cadence_series: series };
 }
@@ -483,6 +483,7 @@ export const RunningPlan: React.FC<RunningPlanProps> = ({ userId, coachId }) =>
 
       const applyPayload: AiPlanApplyRequest = {
         weekly_template: aiPreview.weekly_template,
+        signature: aiPreview.signature,
       };
 
       await applyAiPlan(userId, applyPayload);
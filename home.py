@@ -1,36 +1,41 @@
-
-
+import sys
+
+PLANS = {
+    "5k": (
+        "Check out these 5k training plans!:",
+        "Nike: https://www.nike.com/running/5k-training-plan",
+        "Runner's World: https://www.runnersworld.com/beginner/a40267826/couch-to-5k-runners-program/",
+    ),
+    "10k": (
+        "Check out these 10k training plans!:",
+        "Boston Athletic Association: https://www.baa.org/races/baa-10k/train",
+        "REI: https://www.rei.com/learn/expert-advice/road-running-10k-training-plan.html",
+    ),
+    "half-marathon": (
+        "Check out these half-marathon training plans!:",
+        "Saint Jude: https://www.stjude.org/get-involved/fitness-fundraisers/memphis-marathon/event-information/training/half-marathon-training-schedule-and-tips.html",
+        "Boston Athletic Association: https://www.baa.org/races/baa-half-marathon/train",
+    ),
+    "marathon": (
+        "Check out these marathon training plans!:",
+        "Hal Higdon: https://www.halhigdon.com/training/marathon-training/",
+        "Runner's World: https://www.runnersworld.com/training/a19492479/marathon-training-plans/",
+    ),
+}
+
+# Joined once at import so a lookup is a single write
+_PLAN_TEXT = {length: "".join(f"{line}\n\n" for line in lines) for length, lines in PLANS.items()}
 
 
 def Get_Running_Plan():
     run_length  = input("Enter what length you are training for: 5k, 10k, half-marathon, marathon:\n")
 
-    if run_length == "5k":
-        print("Check out these 5k training plans!:\n")
-        print("Nike: https://www.nike.com/running/5k-training-plan\n")
-        print("Runner's World: https://www.runnersworld.com/beginner/a40267826/couch-to-5k-runners-program/\n")
-    else:
-
-        if run_length == "10k":
-            print("Check out these 10k training plans!:\n")
-            print("Boston Athletic Association: https://www.baa.org/races/baa-10k/train\n")
-            print("REI: https://www.rei.com/learn/expert-advice/road-running-10k-training-plan.html\n")
-        else:
-
-            if run_length == "half-marathon":
-                print("Check out these half-marathon training plans!:\n")
-                print("Saint Jude: https://www.stjude.org/get-involved/fitness-fundraisers/memphis-marathon/event-information/training/half-marathon-training-schedule-and-tips.html\n")
-                print("Boston Athletic Association: https://www.baa.org/races/baa-half-marathon/train\n")
-            else:
-                
-                if run_length == "marathon":
-                    print("Check out these marathon training plans!:\n")
-                    print("Hal Higdon: https://www.halhigdon.com/training/marathon-training/\n")
-                    print("Runner's World: https://www.runnersworld.com/training/a19492479/marathon-training-plans/n\n")
-
-                return
+    text = _PLAN_TEXT.get(run_length)
+    if text is None:
+        return False
+    sys.stdout.write(text)
     print("What else can I help you with?\n")
-    main()
+    return True
 
 
 def Enter_Stats():
@@ -41,14 +46,16 @@ def Enter_Stats():
 
 def main():
     #print("Hello, welcome to RunAssist! How can I help you? Please enter the correct number below:\n")
-    user_choice = input("1: Get a running plan\n2: Enter stats from run\n")
+    while True:
+        user_choice = input("1: Get a running plan\n2: Enter stats from run\n")
 
-    if user_choice == "1":
-        Get_Running_Plan()
+        if user_choice == "1" and Get_Running_Plan():
+            continue  # ask again instead of recursing back into main()
 
-    if user_choice == "2":
-        Enter_Stats()
-    return
+        if user_choice == "2":
+            Enter_Stats()
+        return
 
-print("Hello, welcome to RunAssist! How can I help you? Please enter the correct number below:\n")
-main()
+if __name__ == "__main__":
+    print("Hello, welcome to RunAssist! How can I help you? Please enter the correct number below:\n")
+    main()
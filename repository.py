@@ -1,4 +1,4 @@
-import os, sqlite3, uuid
+import os, sqlite3, threading, uuid
 from datetime import datetime, timezone
 from typing import Iterable, Dict, Any, Optional
 
@@ -7,9 +7,10 @@ DB_DIR = os.path.join(os.path.dirname(__file__), "data")
 os.makedirs(DB_DIR, exist_ok=True)
 DB_PATH = os.path.join(DB_DIR, "runtracker.db")
 
-SCHEMA_SQL = """
-PRAGMA foreign_keys = ON;
+# Bump when SCHEMA_SQL changes; stored in the database's PRAGMA user_version
+SCHEMA_VERSION = 1
 
+SCHEMA_SQL = """
 CREATE TABLE IF NOT EXISTS users (
   id TEXT PRIMARY KEY,
   name TEXT NOT NULL UNIQUE,
@@ -45,40 +46,54 @@ CREATE INDEX IF NOT EXISTS idx_metrics_session ON run_metrics(session_id);
 class Repo:
     def __init__(self, db_path: str = DB_PATH):
         self.db_path = db_path
+        # One connection for the lifetime of the Repo: no connect() per call and
+        # SQLite's page cache stays warm. Autocommit mode; multi-statement writes
+        # take _write_lock so threads sharing the connection don't interleave.
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self._write_lock = threading.Lock()
         self._init_db()
 
-    def _conn(self):
-        conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
-        conn.row_factory = sqlite3.Row
-        conn.execute("PRAGMA foreign_keys = ON;")
-        conn.execute("PRAGMA journal_mode = WAL;")
-        conn.execute("PRAGMA synchronous = NORMAL;")
-        return conn
-
     def _init_db(self):
-        with self._conn() as conn:
-            conn.executescript(SCHEMA_SQL)
+        self.conn.executescript(
+            """
+            PRAGMA journal_mode = WAL;
+            PRAGMA synchronous = NORMAL;
+            PRAGMA busy_timeout = 5000;
+            PRAGMA temp_store = MEMORY;
+            PRAGMA cache_size = -64000;
+            PRAGMA mmap_size = 268435456;
+            PRAGMA foreign_keys = ON;
+            """
+        )
+        # Schema DDL only runs for a new or older database; an up-to-date one
+        # costs a single PRAGMA read
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+            self.conn.executescript(
+                f"BEGIN;\n{SCHEMA_SQL}\nPRAGMA user_version = {SCHEMA_VERSION};\nCOMMIT;"
+            )
+
+    def close(self) -> None:
+        self.conn.close()
 
     #Users 
     def resolve_or_create_user(self, name: str, role: str = "runner") -> Dict[str, Any]:
-        with self._conn() as conn:
-            cur = conn.execute("SELECT id, name, role, created_at FROM users WHERE name=?", (name,))
-            row = cur.fetchone()
-            if row:
-                return dict(row)
-            user_id = uuid.uuid4().hex
-            now = datetime.now(timezone.utc).isoformat()
-            conn.execute(
-                "INSERT INTO users(id, name, role, created_at) VALUES(?,?,?,?)",
-                (user_id, name, role, now),
-            )
-            return {"id": user_id, "name": name, "role": role, "created_at": now}
+        cur = self.conn.execute("SELECT id, name, role, created_at FROM users WHERE name=?", (name,))
+        row = cur.fetchone()
+        if row:
+            return dict(row)
+        user_id = uuid.uuid4().hex
+        now = datetime.now(timezone.utc).isoformat()
+        self.conn.execute(
+            "INSERT INTO users(id, name, role, created_at) VALUES(?,?,?,?)",
+            (user_id, name, role, now),
+        )
+        return {"id": user_id, "name": name, "role": role, "created_at": now}
 
     def get_user_by_id(self, user_id: str) -> Optional[Dict[str, Any]]:
-        with self._conn() as conn:
-            cur = conn.execute("SELECT id, name, role, created_at FROM users WHERE id=?", (user_id,))
-            row = cur.fetchone()
-            return dict(row) if row else None
+        cur = self.conn.execute("SELECT id, name, role, created_at FROM users WHERE id=?", (user_id,))
+        row = cur.fetchone()
+        return dict(row) if row else None
 
     # Write Session + Metrics
     def insert_session_with_metrics(
@@ -92,102 +107,126 @@ class Repo:
         note: Optional[str] = None,
     ) -> str:
         sess_id = uuid.uuid4().hex
-        with self._conn() as conn:
-            conn.execute("BEGIN IMMEDIATE") 
-            conn.execute(
-                "INSERT INTO run_sessions(id, user_id, started_at, ended_at, total_distance, total_duration_seconds, note) "
-                "VALUES (?,?,?,?,?,?,?)",
-                (sess_id, user_id, started_at, ended_at, total_distance, total_duration_seconds, note),
-            )
-            for m in metrics:
+        conn = self.conn
+        with self._write_lock:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
                 conn.execute(
-                    "INSERT INTO run_metrics(id, session_id, distance, duration_seconds, start_time, end_time) "
-                    "VALUES (?,?,?,?,?,?)",
-                    (
-                        uuid.uuid4().hex,
-                        sess_id,
-                        float(m["distance"]),
-                        int(m["duration_seconds"]),
-                        m.get("start_time"),
-                        m.get("end_time"),
-                    ),
+                    "INSERT INTO run_sessions(id, user_id, started_at, ended_at, total_distance, total_duration_seconds, note) "
+                    "VALUES (?,?,?,?,?,?,?)",
+                    (sess_id, user_id, started_at, ended_at, total_distance, total_duration_seconds, note),
                 )
+                for m in metrics:
+                    conn.execute(
+                        "INSERT INTO run_metrics(id, session_id, distance, duration_seconds, start_time, end_time) "
+                        "VALUES (?,?,?,?,?,?)",
+                        (
+                            uuid.uuid4().hex,
+                            sess_id,
+                            float(m["distance"]),
+                            int(m["duration_seconds"]),
+                            m.get("start_time"),
+                            m.get("end_time"),
+                        ),
+                    )
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
             conn.execute("COMMIT")
         return sess_id
 
     #Read History 
     def fetch_history_by_user_id(self, user_id: str, limit: int = 20) -> Dict[str, Any]:
-        with self._conn() as conn:
-            u = self.get_user_by_id(user_id)
-            if not u:
-                return {"user_id": "", "username": "", "count": 0, "sessions": []}
-            cur = conn.execute(
-                "SELECT id, started_at, ended_at, total_distance, total_duration_seconds "
-                "FROM run_sessions WHERE user_id=? ORDER BY started_at DESC LIMIT ?",
-                (user_id, limit),
+        conn = self.conn
+        u = self.get_user_by_id(user_id)
+        if not u:
+            return {"user_id": "", "username": "", "count": 0, "sessions": []}
+        cur = conn.execute(
+            "SELECT id, started_at, ended_at, total_distance, total_duration_seconds "
+            "FROM run_sessions WHERE user_id=? ORDER BY started_at DESC LIMIT ?",
+            (user_id, limit),
+        )
+        rows = cur.fetchall()
+
+        # One query for every session's metrics, bucketed by session id
+        metrics_by_sid: Dict[str, list] = {row["id"]: [] for row in rows}
+        if rows:
+            placeholders = ",".join("?" * len(rows))
+            cm = conn.execute(
+                "SELECT session_id, id, distance, duration_seconds, start_time, end_time "
+                f"FROM run_metrics WHERE session_id IN ({placeholders}) "
+                "ORDER BY session_id, id ASC",
+                list(metrics_by_sid),
             )
-            sessions = []
-            for row in cur.fetchall():
-                sid = row["id"]
-                cm = conn.execute(
-                    "SELECT id, distance, duration_seconds, start_time, end_time "
-                    "FROM run_metrics WHERE session_id=? ORDER BY id ASC",
-                    (sid,),
-                )
-                metrics = [dict(mr) for mr in cm.fetchall()]
-                sessions.append(
+            # Unpack by position from the explicit column list above
+            for sid, mid, distance, duration, start_time, end_time in cm:
+                metrics_by_sid[sid].append(
                     {
-                        "id": sid,
-                        "user_id": user_id,
-                        "started_at": row["started_at"],
-                        "ended_at": row["ended_at"],
-                        "total_distance": row["total_distance"],
-                        "total_duration_seconds": row["total_duration_seconds"],
-                        "metrics": metrics,
+                        "id": mid,
+                        "distance": distance,
+                        "duration_seconds": duration,
+                        "start_time": start_time,
+                        "end_time": end_time,
                     }
                 )
-            return {"user_id": user_id, "username": u["name"], "count": len(sessions), "sessions": sessions}
 
-    # Prompt Payload
-    def fetch_recent_for_prompt_by_user_id(self, user_id: str, last_n: int = 5) -> Dict[str, Any]:
-        with self._conn() as conn:
-            u = self.get_user_by_id(user_id)
-            if not u:
-                return {
-                    "user_id": "",
-                    "username": "",
-                    "role": "runner",
-                    "totals": {"total_distance": 0.0, "sessions": 0},
-                    "recent_sessions": [],
+        sessions = []
+        for row in rows:
+            sid = row["id"]
+            metrics = metrics_by_sid[sid]
+            sessions.append(
+                {
+                    "id": sid,
+                    "user_id": user_id,
+                    "started_at": row["started_at"],
+                    "ended_at": row["ended_at"],
+                    "total_distance": row["total_distance"],
+                    "total_duration_seconds": row["total_duration_seconds"],
+                    "metrics": metrics,
                 }
-            cur = conn.execute(
-                "SELECT id, started_at, ended_at, total_distance, total_duration_seconds "
-                "FROM run_sessions WHERE user_id=? ORDER BY started_at DESC LIMIT ?",
-                (user_id, last_n),
             )
-            rows = cur.fetchall()
-            recent, total_dist = [], 0.0
-            for r in rows:
-                dist, dur = float(r["total_distance"]), int(r["total_duration_seconds"])
-                total_dist += dist
-                pace = None
-                if dist > 0:
-                    s_per_km = dur / dist
-                    pace = f"{int(s_per_km)//60:02d}:{int(s_per_km)%60:02d} /km"
-                recent.append(
-                    {
-                        "session_id": r["id"],
-                        "started_at": r["started_at"],
-                        "ended_at": r["ended_at"],
-                        "total_distance_km": round(dist, 3),
-                        "total_duration_seconds": dur,
-                        "avg_pace": pace,
-                    }
-                )
+        return {"user_id": user_id, "username": u["name"], "count": len(sessions), "sessions": sessions}
+
+    # Prompt Payload
+    def fetch_recent_for_prompt_by_user_id(self, user_id: str, last_n: int = 5) -> Dict[str, Any]:
+        conn = self.conn
+        u = self.get_user_by_id(user_id)
+        if not u:
             return {
-                "user_id": user_id,
-                "username": u["name"],
-                "role": u["role"],
-                "totals": {"total_distance": round(total_dist, 3), "sessions": len(rows)},
-                "recent_sessions": recent,
+                "user_id": "",
+                "username": "",
+                "role": "runner",
+                "totals": {"total_distance": 0.0, "sessions": 0},
+                "recent_sessions": [],
             }
+        cur = conn.execute(
+            "SELECT id, started_at, ended_at, total_distance, total_duration_seconds "
+            "FROM run_sessions WHERE user_id=? ORDER BY started_at DESC LIMIT ?",
+            (user_id, last_n),
+        )
+        rows = cur.fetchall()
+        recent, total_dist = [], 0.0
+        for r in rows:
+            dist, dur = float(r["total_distance"]), int(r["total_duration_seconds"])
+            total_dist += dist
+            pace = None
+            if dist > 0:
+                minutes, seconds = divmod(int(dur / dist), 60)
+                pace = f"{minutes:02d}:{seconds:02d} /km"
+            recent.append(
+                {
+                    "session_id": r["id"],
+                    "started_at": r["started_at"],
+                    "ended_at": r["ended_at"],
+                    "total_distance_km": round(dist, 3),
+                    "total_duration_seconds": dur,
+                    "avg_pace": pace,
+                }
+            )
+        return {
+            "user_id": user_id,
+            "username": u["name"],
+            "role": u["role"],
+            "totals": {"total_distance": round(total_dist, 3), "sessions": len(rows)},
+            "recent_sessions": recent,
+        }
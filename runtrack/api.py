@@ -1,25 +1,123 @@
-from typing import Any, Dict, List, Literal, Optional
-
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import RedirectResponse
+"""
+FastAPI app for RunAssistAI.
+
+Middleware note: write any new middleware as plain ASGI middleware
+(a class with `async def __call__(self, scope, receive, send)`), not with
+@app.middleware("http") / BaseHTTPMiddleware, which wraps every request and
+response in extra objects and tasks.
+"""
+
+import asyncio
+import functools
+import hashlib
+import hmac
+import os
+import secrets
+from contextlib import asynccontextmanager
+from typing import Annotated, Any, Dict, List, Literal, Optional
+
+import anyio.to_thread
+import orjson
+from fastapi import (
+    BackgroundTasks,
+    FastAPI,
+    HTTPException,
+    Path,
+    Query,
+    Request,
+    Response,
+)
+from fastapi.concurrency import run_in_threadpool
+from fastapi.openapi.docs import (
+    get_redoc_html,
+    get_swagger_ui_html,
+    get_swagger_ui_oauth2_redirect_html,
+)
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
+from fastapi.middleware.gzip import GZipMiddleware
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError
 
 from . import services
 
-app = FastAPI(title="RunAssistAI Demo API")
 
-# Allow frontend Vite(5173) to access
+class ORJSONResponse(JSONResponse):
+    """JSONResponse rendered by orjson (datetimes and numpy scalars handled in C)."""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(
+            content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        )
+
+
+# Sync handlers run in anyio's worker threads (40 by default). They mostly
+# wait on SQLite or Strava, so allow more of them to be in flight at once.
+THREADPOOL_SIZE = int(os.getenv("RUNTRACK_THREADPOOL_SIZE", "100"))
+
+
+async def _db_maintenance_loop() -> None:
+    while True:
+        await asyncio.sleep(services.DB_MAINTENANCE_INTERVAL_SECONDS)
+        await run_in_threadpool(services.run_db_maintenance)
+
+
+@asynccontextmanager
+async def _lifespan(app: FastAPI):
+    anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+    maintenance = asyncio.create_task(_db_maintenance_loop())
+    yield
+    maintenance.cancel()
+    services.close_strava_client()
+
+
+OPENAPI_URL = "/openapi.json"
+
+# The schema and docs routes are registered at the bottom of this module so
+# /openapi.json can serve pre-encoded bytes
+app = FastAPI(
+    title="RunAssistAI Demo API",
+    default_response_class=ORJSONResponse,
+    lifespan=_lifespan,
+    openapi_url=None,
+    docs_url=None,
+    redoc_url=None,
+)
+
+# Allow frontend Vite(5173) to access; extra origins come from CORS_ALLOW_ORIGINS
+# (comma separated), read once at import
+DEFAULT_CORS_ORIGINS = ("http://localhost:5173", "http://127.0.0.1:5173")
+CORS_ALLOW_ORIGINS = list(DEFAULT_CORS_ORIGINS) + [
+    origin.strip()
+    for origin in os.getenv("CORS_ALLOW_ORIGINS", "").split(",")
+    if origin.strip()
+]
+CORS_ALLOW_METHODS = ["*"]
+CORS_ALLOW_HEADERS = ["*"]
+
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["http://localhost:5173", "http://127.0.0.1:5173"],
+    allow_origins=CORS_ALLOW_ORIGINS,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=CORS_ALLOW_METHODS,
+    allow_headers=CORS_ALLOW_HEADERS,
 )
+# Calendar months and Strava run details are large, very compressible JSON
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
 
 # ---------- Pydantic models ----------
 
+# 24-hour "HH:MM"; shared so every model reuses one validator definition
+HHMM_PATTERN = r"^([01]\d|2[0-3]):[0-5]\d$"
+HHMM = Annotated[str, Field(pattern=HHMM_PATTERN, description="HH:MM")]
+
+# Bounded route parameters; out-of-range values are rejected with 422
+# before the handler runs
+RangeDays = Annotated[int, Query(ge=1, le=365)]
+RangeWeeks = Annotated[int, Query(ge=1, le=52)]
+ListLimit = Annotated[int, Query(ge=1, le=100)]
+ActivityId = Annotated[int, Path(ge=1)]
+
 
 class UserResolveIn(BaseModel):
     username: str
@@ -48,6 +146,11 @@ class StartRunIn(BaseModel):
     note: Optional[str] = None
 
 
+class AddMetricsBulkIn(BaseModel):
+    distance_km: List[float]
+    duration_seconds: List[int]
+
+
 class StopRunIn(BaseModel):
     total_distance_km: Optional[float] = None
     elapsed_seconds: Optional[int] = None
@@ -59,7 +162,7 @@ class CaloriesPerHourIn(BaseModel):
 
 class DayPlanCreateIn(BaseModel):
     date: str = Field(..., description="YYYY-MM-DD")
-    start_time: str = Field(..., pattern=r"^\d{2}:\d{2}$", description="HH:MM")
+    start_time: HHMM
     duration_minutes: int
     distance_km: float
     activity: Optional[str] = None
@@ -69,8 +172,8 @@ class DayPlanCreateIn(BaseModel):
 # AI testing plan input model
 class AiWeeklySlotIn(BaseModel):
   weekday: int = Field(..., ge=0, le=6, description="0=Mon ... 6=Sun")
-  start_time: str = Field(..., pattern=r"^\d{2}:\d{2}$", description="HH:MM")
-  end_time: str = Field(..., pattern=r"^\d{2}:\d{2}$", description="HH:MM")
+  start_time: HHMM
+  end_time: HHMM
 
 
 class AiPlanGenerateIn(BaseModel):
@@ -84,7 +187,7 @@ class AiPlanGenerateIn(BaseModel):
     weekly_slots: List[AiWeeklySlotIn]
 
 class AiPlanActivityIn(BaseModel):
-    start_time: str = Field(..., pattern=r"^\d{2}:\d{2}$", description="HH:MM")
+    start_time: HHMM
     duration_minutes: int
     distance_km: float
     activity: str
@@ -104,6 +207,68 @@ class AiPlanApplyIn(BaseModel):
     days: Optional[int] = Field(
         None, gt=0, description="How many days to apply; default 30"
     )
+    signature: Optional[str] = Field(
+        None, description="Signature from the preview response, if unchanged"
+    )
+
+
+# Preview responses carry an HMAC over their (already validated) weekly
+# template; apply skips re-validating a template whose signature matches.
+# The key is per process, so a signature from another worker or an earlier
+# run simply falls back to full validation.
+_TEMPLATE_SIGNING_KEY = secrets.token_bytes(32)
+_WEEKLY_TEMPLATE_ADAPTER = TypeAdapter(List[AiPlanDayIn])
+
+
+def _canonical_json(value: Any) -> Any:
+    # JSON has a single number type, so a template echoed back by the
+    # browser returns 5.0 as 5; integral floats are signed as ints so the
+    # signature survives that round trip.
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, list):
+        return [_canonical_json(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _canonical_json(v) for k, v in value.items()}
+    return value
+
+
+def _sign_weekly_template(template: Any) -> str:
+    body = orjson.dumps(_canonical_json(template), option=orjson.OPT_SORT_KEYS)
+    return hmac.new(_TEMPLATE_SIGNING_KEY, body, hashlib.sha256).hexdigest()
+
+
+def _has_valid_signature(raw: Dict[str, Any]) -> bool:
+    signature = raw.get("signature")
+    if not isinstance(signature, str) or "weekly_template" not in raw:
+        return False
+    try:
+        expected = _sign_weekly_template(raw["weekly_template"])
+    except TypeError:
+        return False
+    return hmac.compare_digest(signature, expected)
+
+
+def _inline_json_schema(model: type[BaseModel]) -> Dict[str, Any]:
+    """
+    JSON schema for `model` with its nested models inlined, for routes
+    that document a body they parse themselves (local $defs refs would not
+    resolve inside the OpenAPI document).
+    """
+    schema = model.model_json_schema()
+    defs = schema.pop("$defs", {})
+
+    def resolve(node: Any) -> Any:
+        if isinstance(node, dict):
+            ref = node.get("$ref")
+            if isinstance(ref, str) and ref.startswith("#/$defs/"):
+                return resolve(defs[ref[len("#/$defs/"):]])
+            return {k: resolve(v) for k, v in node.items()}
+        if isinstance(node, list):
+            return [resolve(v) for v in node]
+        return node
+
+    return resolve(schema)
 
 
 class CoachBindRunnerIn(BaseModel):
@@ -131,6 +296,19 @@ class CoachNoteOut(BaseModel):
     created_at: str
 
 
+# List endpoints validate and serialize the whole list in one pydantic-core
+# call instead of building one model per row.
+_RUNNERS_ADAPTER = TypeAdapter(List[BoundRunnerOut])
+_NOTES_ADAPTER = TypeAdapter(List[CoachNoteOut])
+
+
+def _list_json(adapter: TypeAdapter, rows: List[Dict[str, Any]]) -> Response:
+    return Response(
+        adapter.dump_json(adapter.validate_python(rows)),
+        media_type="application/json",
+    )
+
+
 class StravaLinkOut(BaseModel):
     authorize_url: str
     state: str
@@ -144,16 +322,12 @@ class StravaStatusOut(BaseModel):
     last_sync_cursor: Optional[int] = None
     expires_at: Optional[int] = None
     access_token_valid: Optional[bool] = None
+    sync_in_progress: bool = False
 
 
-class StravaSyncOut(BaseModel):
+class StravaSyncQueuedOut(BaseModel):
+    status: Literal["queued", "already_running"]
     user_id: str
-    athlete_id: Optional[int] = None
-    imported_sessions: int
-    skipped_activities: int
-    last_sync_cursor: Optional[int] = None
-    last_activity_at: Optional[str] = None
-    synced_at: Optional[str] = None
 
 
 class RecentRunSession(BaseModel):
@@ -204,13 +378,15 @@ class StravaRunDetailOut(BaseModel):
     average_speed: Optional[float] = None
     average_watts: Optional[float] = None
     splits: List[StravaSplitOut]
-    pace_cadence_series: List[Dict[str, Any]]
 
 
 # ---------- Users / Auth / Dashboard ----------
+# Routes that build their output model themselves skip response_model, so
+# the result is not validated a second time on the way out. response_model is
+# kept where it shapes a plain dict coming back from services.
 
 # Old endpoint: automatically create user (mostly unused by frontend now, but kept for compatibility)
-@app.post("/api/resolve_user", response_model=UserOut)
+@app.post("/api/resolve_user")
 def api_resolve_user(body: UserResolveIn):
     u = services.resolve_or_create_user(body.username)
     return UserOut(
@@ -221,7 +397,7 @@ def api_resolve_user(body: UserResolveIn):
     )
 
 
-@app.post("/api/auth/register", response_model=UserOut)
+@app.post("/api/auth/register")
 def api_register_user(body: RegisterIn):
     try:
         user = services.register_user(body.username, body.password, body.role)
@@ -236,7 +412,7 @@ def api_register_user(body: RegisterIn):
     )
 
 
-@app.post("/api/auth/login", response_model=UserOut)
+@app.post("/api/auth/login")
 def api_login_user(body: LoginIn):
     try:
         user = services.login_user(body.username, body.password, body.role)
@@ -258,7 +434,7 @@ def api_login_user(body: LoginIn):
 
 
 @app.get("/api/dashboard/{user_id}")
-def api_get_dashboard(user_id: str, days: int, weeks: int):
+def api_get_dashboard(user_id: str, days: RangeDays, weeks: RangeWeeks):
     try:
         return services.get_dashboard(user_id, days, weeks)
     except ValueError as e:
@@ -268,7 +444,7 @@ def api_get_dashboard(user_id: str, days: int, weeks: int):
 # ---------- Coach <-> Runner binding ----------
 
 
-@app.post("/api/coach/{coach_id}/bind_runner", response_model=BoundRunnerOut)
+@app.post("/api/coach/{coach_id}/bind_runner")
 def api_coach_bind_runner(coach_id: str, body: CoachBindRunnerIn):
     try:
         res = services.bind_runner_to_coach(coach_id, body.runner_code)
@@ -283,7 +459,7 @@ def api_coach_list_runners(coach_id: str):
     try:
         runners = services.list_coach_runners(coach_id)
         # services returns: [{"id", "name", "runner_code"}, ...]
-        return [BoundRunnerOut(**r) for r in runners]
+        return _list_json(_RUNNERS_ADAPTER, runners)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -291,10 +467,7 @@ def api_coach_list_runners(coach_id: str):
 # ---------- Coach notes APIs ----------
 
 
-@app.post(
-    "/api/coach/{coach_id}/runner/{runner_id}/notes",
-    response_model=CoachNoteOut,
-)
+@app.post("/api/coach/{coach_id}/runner/{runner_id}/notes")
 def api_create_coach_note(
     coach_id: str,
     runner_id: str,
@@ -309,7 +482,7 @@ def api_create_coach_note(
             runner_id=runner_id,
             content=body.content,
         )
-        return note
+        return CoachNoteOut(**note)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -320,7 +493,7 @@ def api_list_runner_notes(runner_id: str):
     Query all coach notes for a runner.
     """
     try:
-        return services.list_notes_for_runner(runner_id)
+        return _list_json(_NOTES_ADAPTER, services.list_notes_for_runner(runner_id))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -360,6 +533,22 @@ def api_resume_run(user_id: str):
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@app.post("/api/run/metrics_bulk/{user_id}")
+def api_add_metrics_bulk(user_id: str, payload: AddMetricsBulkIn):
+    """
+    POST /api/run/metrics_bulk/{user_id}
+    Record many samples for the active session in one request.
+    """
+    try:
+        return services.add_metrics_bulk(
+            user_id,
+            payload.distance_km,
+            payload.duration_seconds,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @app.post("/api/run/stop/{user_id}")
 def api_stop_run(user_id: str, payload: StopRunIn):
     try:
@@ -444,20 +633,60 @@ def api_delete_day_plan(user_id: str, plan_id: str):
 @app.post("/api/running_plan/ai/preview/{user_id}")
 def api_preview_ai_weekly_plan(user_id: str, payload: AiPlanGenerateIn):
     try:
-        return services.build_test_weekly_ai_plan(
+        plan = services.build_test_weekly_ai_plan(
             user_id=user_id,
-            payload=payload.dict(),
+            payload=payload.model_dump(),
         )
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    try:
+        _WEEKLY_TEMPLATE_ADAPTER.validate_python(plan.get("weekly_template"))
+    except ValidationError:
+        # Unsigned: apply will validate (and report) it in full
+        return plan
+    plan["signature"] = _sign_weekly_template(plan["weekly_template"])
+    return plan
 
 
-@app.post("/api/running_plan/ai/apply/{user_id}")
-def api_apply_ai_weekly_plan(user_id: str, payload: AiPlanApplyIn):
+@app.post(
+    "/api/running_plan/ai/apply/{user_id}",
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {"schema": _inline_json_schema(AiPlanApplyIn)}},
+        }
+    },
+)
+async def api_apply_ai_weekly_plan(user_id: str, request: Request):
+    """
+    POST /api/running_plan/ai/apply/{user_id}
+    Body: AiPlanApplyIn. A weekly_template echoed back with its preview
+    signature skips the nested per-activity validation.
+    """
     try:
-        return services.apply_test_weekly_ai_plan(
-            user_id=user_id,
-            payload=payload.dict(),
+        raw = orjson.loads(await request.body())
+    except orjson.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="invalid JSON body")
+    if not isinstance(raw, dict):
+        raise HTTPException(status_code=400, detail="JSON object body required")
+
+    try:
+        if _has_valid_signature(raw):
+            # Only the small top-level fields still need validating
+            options = AiPlanApplyIn.model_validate({**raw, "weekly_template": []})
+            payload = options.model_dump()
+            payload["weekly_template"] = raw["weekly_template"]
+        else:
+            payload = AiPlanApplyIn.model_validate(raw).model_dump()
+    except ValidationError as e:
+        # Same shape as FastAPI's own body validation errors
+        raise RequestValidationError(
+            [{**err, "loc": ("body", *err["loc"])} for err in e.errors(include_url=False)]
+        )
+
+    try:
+        return await run_in_threadpool(
+            services.apply_test_weekly_ai_plan, user_id=user_id, payload=payload
         )
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -480,12 +709,24 @@ def api_strava_status(user_id: str):
         raise HTTPException(status_code=400, detail=str(e))
 
 
-@app.post("/api/strava/sync/{user_id}", response_model=StravaSyncOut)
-def api_strava_sync(user_id: str):
+@app.post(
+    "/api/strava/sync/{user_id}",
+    response_model=StravaSyncQueuedOut,
+    status_code=202,
+)
+def api_strava_sync(user_id: str, background_tasks: BackgroundTasks):
+    """
+    POST /api/strava/sync/{user_id}
+    Queues the sync and returns immediately; poll /api/strava/status for
+    sync_in_progress.
+    """
     try:
-        return services.strava_sync_runner(user_id)
+        queued = services.queue_strava_sync(user_id)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    if queued:
+        background_tasks.add_task(services.run_queued_strava_sync, user_id)
+    return {"status": "queued" if queued else "already_running", "user_id": user_id}
 
 
 @app.get("/api/strava/callback")
@@ -495,27 +736,92 @@ def api_strava_callback(code: str, state: str, scope: Optional[str] = None):
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+    return RedirectResponse(url=f"{_strava_redirect_prefix()}{result['user_id']}")
+
+
+@functools.lru_cache(maxsize=1)
+def _strava_redirect_prefix() -> str:
+    # The post-auth redirect is fixed per deploy; only the user id varies
     redirect_url = services.get_strava_post_auth_redirect()
     separator = "&" if "?" in redirect_url else "?"
-    target = f"{redirect_url}{separator}strava_linked=1&user_id={result['user_id']}"
-    return RedirectResponse(url=target)
+    return f"{redirect_url}{separator}strava_linked=1&user_id="
 
 
 @app.get("/api/health")
-def api_health():
+async def api_health():
     return {"status": "ok"}
 
 
 @app.get("/api/run/recent/{user_id}", response_model=RecentRunsOut)
-def api_recent_runs(user_id: str, limit: int = 5):
+def api_recent_runs(user_id: str, limit: ListLimit = 5):
     try:
         return services.get_recent_runs(user_id, limit)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
+# ---------- History / prompt (ETag-aware) ----------
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    return header.strip() == "*" or etag in (t.strip() for t in header.split(","))
+
+
+@app.get("/api/history/{user_id}")
+def api_history(
+    user_id: str,
+    request: Request,
+    response: Response,
+    limit: int = Query(20, ge=1, le=200),
+):
+    """
+    GET /api/history/{user_id}?limit=20
+    Returns 304 when the client's ETag still matches the user's data version.
+    Plain def: the version lookup is a SQLite read, so the whole handler runs
+    in the threadpool rather than on the event loop.
+    """
+    try:
+        version = services.get_user_version(user_id)
+        etag = f'W/"{user_id}-{version}-{limit}"'
+        if _etag_matches(request, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+        data = services.view_history(user_id, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    response.headers["ETag"] = etag
+    return data
+
+
+@app.get("/api/prompt/{user_id}")
+def api_prompt(
+    user_id: str,
+    request: Request,
+    response: Response,
+    last_n: int = Query(5, ge=1, le=50),
+):
+    """
+    GET /api/prompt/{user_id}?last_n=5
+    Returns 304 when the client's ETag still matches the user's data version.
+    """
+    try:
+        version = services.get_user_version(user_id)
+        etag = f'W/"{user_id}-{version}-{last_n}"'
+        if _etag_matches(request, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+        data = services.build_prompt_payload(user_id, last_n)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    response.headers["ETag"] = etag
+    return data
+
+
 @app.get("/api/strava/runs/{user_id}", response_model=List[StravaRunOut])
-def api_recent_strava_runs(user_id: str, limit: int = 5, sync: bool = False):
+def api_recent_strava_runs(
+    user_id: str, limit: ListLimit = 5, sync: bool = False
+):
     try:
         return services.get_recent_strava_runs(user_id, limit, sync)
     except ValueError as e:
@@ -525,8 +831,64 @@ def api_recent_strava_runs(user_id: str, limit: int = 5, sync: bool = False):
 @app.get(
     "/api/strava/run/{user_id}/{activity_id}", response_model=StravaRunDetailOut
 )
-def api_strava_run_detail(user_id: str, activity_id: int):
+def api_strava_run_detail(user_id: str, activity_id: ActivityId):
     try:
         return services.get_strava_run_detail(user_id, activity_id)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/api/strava/run/{user_id}/{activity_id}/series")
+def api_strava_run_series(user_id: str, activity_id: ActivityId):
+    """
+    GET /api/strava/run/{user_id}/{activity_id}/series
+    Pace/cadence points streamed as NDJSON, one object per line.
+    """
+    try:
+        points = services.get_strava_pace_series(user_id, activity_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return StreamingResponse(
+        (orjson.dumps(point) + b"\n" for point in points),
+        media_type="application/x-ndjson",
+    )
+
+
+# ---------- OpenAPI ----------
+
+# The schema only changes when routes do, so serialize it once on first
+# request instead of re-encoding the dict for every /openapi.json hit.
+_openapi_bytes: Optional[bytes] = None
+
+
+def _openapi_json_bytes() -> bytes:
+    global _openapi_bytes
+    if _openapi_bytes is None:
+        _openapi_bytes = orjson.dumps(app.openapi())
+    return _openapi_bytes
+
+
+@app.get(OPENAPI_URL, include_in_schema=False)
+async def api_openapi_json():
+    return Response(_openapi_json_bytes(), media_type="application/json")
+
+
+@app.get("/docs", include_in_schema=False)
+async def api_swagger_ui(request: Request) -> HTMLResponse:
+    root_path = request.scope.get("root_path", "").rstrip("/")
+    return get_swagger_ui_html(
+        openapi_url=root_path + OPENAPI_URL,
+        title=f"{app.title} - Swagger UI",
+        oauth2_redirect_url=root_path + "/docs/oauth2-redirect",
+    )
+
+
+@app.get("/docs/oauth2-redirect", include_in_schema=False)
+async def api_swagger_ui_redirect() -> HTMLResponse:
+    return get_swagger_ui_oauth2_redirect_html()
+
+
+@app.get("/redoc", include_in_schema=False)
+async def api_redoc(request: Request) -> HTMLResponse:
+    root_path = request.scope.get("root_path", "").rstrip("/")
+    return get_redoc_html(openapi_url=root_path + OPENAPI_URL, title=f"{app.title} - ReDoc")
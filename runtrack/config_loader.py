@@ -1,23 +1,30 @@
 from __future__ import annotations
 
-import json
+from functools import lru_cache
 from pathlib import Path
 from typing import Any, Dict
 
+import orjson
+
 BASE_DIR = Path(__file__).resolve().parent
 
 
+@lru_cache(maxsize=None)
 def load_json_config(*relative_paths: str) -> Dict[str, Any]:
     """
     Try each relative path under the runtrack package and load the first JSON file found.
     Returns an empty dict if no file can be read.
+
+    Results are cached per path tuple for the life of the process; callers must
+    treat the returned dict as read-only. Use load_json_config.cache_clear()
+    to pick up edited files (e.g. in tests).
     """
     for rel_path in relative_paths:
         path = BASE_DIR / rel_path
         if not path.exists():
             continue
         try:
-            data = json.loads(path.read_text())
+            data = orjson.loads(path.read_bytes())
             if isinstance(data, dict):
                 return data
         except Exception:
@@ -1,29 +1,102 @@
 from __future__ import annotations
 
 import sqlite3
+import time
 import uuid
 import json
-from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional, Tuple
+import logging
+import queue
+import threading
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 import random
 
+import orjson
+
+_EPOCH_DATE = date(1970, 1, 1)
+
+# INSERT/UPDATE ... RETURNING needs SQLite 3.35+
+_HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+# Idle read-only connections kept for reuse; busier moments open extra ones
+# that are closed when handed back
+_READ_POOL_SIZE = 8
+
+_USER_CACHE_MAX = 1024
+
+# Runner codes are random integers in 1.._RUNNER_CODE_MAX; see Repo._insert_user
+_RUNNER_CODE_MAX = 10000
+_RUNNER_CODE_BLIND_DRAWS = 5
+_RUNNER_CODE_ATTEMPTS = 10
+
+# Shared by create_session_from_import and record_strava_activity_imports_bulk
+_INSERT_IMPORTED_SESSION_SQL = """
+    INSERT INTO sessions(
+        id, user_id, started_at, ended_at,
+        total_distance_km, total_duration_seconds, total_calories,
+        calories_per_hour, note, started_at_epoch
+    )
+    VALUES(?,?,?,?,?,?,?,?,?,?)
+"""
+_INSERT_IMPORTED_METRIC_SQL = """
+    INSERT INTO metrics(id, session_id, distance, duration_seconds, start_time, end_time)
+    VALUES (?,?,?,?,?,?)
+"""
+# Shared by create_daily_plan and create_daily_plans_bulk
+_INSERT_DAILY_PLAN_SQL = """
+    INSERT INTO daily_running_plan(
+      id, user_id, plan_date, start_time_local,
+      duration_minutes, distance_km, activity, description, created_at
+    )
+    VALUES(?,?,?,?,?,?,?,?,?)
+"""
+
+
+_utcnow_cache: Tuple[int, str] = (-1, "")
+
 
 def _utcnow_iso() -> str:
     """
     Return the current UTC time as an ISO-8601 string with seconds precision
-    and a trailing 'Z', e.g. '2025-11-23T12:34:56Z'.
+    and a trailing 'Z', e.g. '2025-11-23T12:34:56Z'. The string only changes
+    once a second, so it is formatted once per second and reused.
+    """
+    global _utcnow_cache
+    now = int(time.time())
+    cached_second, cached_iso = _utcnow_cache
+    if now != cached_second:
+        cached_iso = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(now))
+        _utcnow_cache = (now, cached_iso)
+    return cached_iso
+
+
+def _iso_to_epoch(value: str) -> int:
     """
-    return datetime.utcnow().isoformat(timespec="seconds") + "Z"
+    Convert an ISO-8601 timestamp to integer epoch seconds. A trailing 'Z' or
+    an offset is honoured; naive values are taken as UTC.
+    """
+    dt = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp())
+
+
+def _epoch_day_to_date(day: int) -> str:
+    """Format a UTC day number (epoch seconds // 86400) as 'YYYY-MM-DD'."""
+    return (_EPOCH_DATE + timedelta(days=day)).isoformat()
 
 
 def _text_id(value: Any) -> str:
     """
     Ensure IDs passed to SQLite are plain strings.
     """
+    # Fast path first: nearly every caller already passes a str
+    if type(value) is str:
+        return value
     if value is None:
         raise ValueError("user_id cannot be None")
-    if isinstance(value, str):
-        return value
     # Handle UUID objects and other types
     result = str(value).strip()
     if not result:
@@ -44,9 +117,88 @@ class Repo:
         """
         Initialize the repository and ensure the database schema exists.
         """
-        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        # sqlite3 caches prepared statements per connection, keyed by SQL
+        # text; room for every distinct query this class issues
+        self.conn = sqlite3.connect(
+            db_path, check_same_thread=False, cached_statements=256
+        )
         self.conn.row_factory = sqlite3.Row
+        # User rows are never updated or deleted once written, so a hit can
+        # never be stale, even with several worker processes on one DB.
+        self._user_cache: OrderedDict[str, Dict[str, Any]] = OrderedDict()
+        self._user_cache_lock = threading.Lock()
+        # WAL lets readers run alongside a writer and, with synchronous=NORMAL,
+        # costs one fsync per checkpoint instead of two per commit. WAL is
+        # stored in the file; the other settings are per connection.
+        self.conn.executescript(
+            """
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            PRAGMA temp_store=MEMORY;
+            PRAGMA mmap_size=268435456;
+            PRAGMA cache_size=-65536;
+            PRAGMA busy_timeout=5000;
+            PRAGMA wal_autocheckpoint=1000;
+            PRAGMA foreign_keys=ON;
+            """
+        )
         self._ensure_schema()
+        # Reads go through separate query_only connections so concurrent
+        # requests can read in parallel under WAL while self.conn stays the
+        # single writer. An in-memory database is private to its connection,
+        # so there everything reads through self.conn.
+        self._db_path = db_path
+        self._read_pool: Optional[queue.Queue] = (
+            None if db_path in ("", ":memory:") else queue.Queue(maxsize=_READ_POOL_SIZE)
+        )
+        # Refresh planner statistics for tables whose indexes changed; cheap
+        # and bounded on SQLite 3.46+, a no-op on older versions
+        self.conn.execute("PRAGMA optimize=0x10002")
+
+    def run_maintenance(self) -> None:
+        """
+        Periodic housekeeping: refresh planner statistics and truncate the WAL
+        file back to zero once its frames are checkpointed into the database.
+        """
+        self.conn.execute("PRAGMA optimize")
+        self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+
+    def _open_read_conn(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self._db_path, check_same_thread=False, cached_statements=256
+        )
+        conn.row_factory = sqlite3.Row
+        conn.executescript(
+            """
+            PRAGMA query_only=ON;
+            PRAGMA temp_store=MEMORY;
+            PRAGMA mmap_size=268435456;
+            PRAGMA cache_size=-16384;
+            PRAGMA busy_timeout=5000;
+            """
+        )
+        return conn
+
+    @contextmanager
+    def _read_conn(self) -> Iterator[sqlite3.Connection]:
+        """
+        Borrow a read-only connection for one read method. Callers must
+        finish with their cursors inside the block.
+        """
+        if self._read_pool is None:
+            yield self.conn
+            return
+        try:
+            conn = self._read_pool.get_nowait()
+        except queue.Empty:
+            conn = self._open_read_conn()
+        try:
+            yield conn
+        finally:
+            try:
+                self._read_pool.put_nowait(conn)
+            except queue.Full:
+                conn.close()
 
     # ---------- schema ----------
 
@@ -55,6 +207,8 @@ class Repo:
         Create all required tables and indexes if they do not already exist.
         """
         cur = self.conn.cursor()
+        # One transaction for the whole schema instead of one per statement
+        cur.execute("BEGIN")
 
         # users
         cur.execute(
@@ -69,6 +223,7 @@ class Repo:
             )
             """
         )
+        self._ensure_runner_code_index(cur)
 
         # user settings
         cur.execute(
@@ -94,10 +249,25 @@ class Repo:
                 total_calories REAL NOT NULL DEFAULT 0,
                 calories_per_hour REAL NOT NULL,
                 note TEXT,
+                started_at_epoch INTEGER,
                 FOREIGN KEY (user_id) REFERENCES users(id)
             )
             """
         )
+        self._migrate_sessions_started_at_epoch(cur)
+        cur.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_sessions_user_started
+            ON sessions(user_id, started_at)
+            """
+        )
+        # Stats range scans compare integers rather than ISO strings
+        cur.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_sessions_user_started_epoch
+            ON sessions(user_id, started_at_epoch)
+            """
+        )
 
         # metrics
         cur.execute(
@@ -113,6 +283,12 @@ class Repo:
             )
             """
         )
+        cur.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_metrics_session
+            ON metrics(session_id)
+            """
+        )
 
         # training plans
         cur.execute(
@@ -130,6 +306,12 @@ class Repo:
             )
             """
         )
+        cur.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_plans_user_created
+            ON plans(user_id, created_at)
+            """
+        )
 
         cur.execute(
             """
@@ -153,6 +335,12 @@ class Repo:
             )
             """
         )
+        cur.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_plan_entries_plan
+            ON plan_entries(plan_id, day_index)
+            """
+        )
 
         # weekly_plan_rules (legacy)
         cur.execute(
@@ -188,12 +376,15 @@ class Repo:
             )
             """
         )
+        # Matches the month/day list ORDER BY, so range reads need no sort;
+        # it supersedes the old (user_id, plan_date) index
         cur.execute(
             """
-            CREATE INDEX IF NOT EXISTS idx_daily_running_plan_user_date
-            ON daily_running_plan(user_id, plan_date)
+            CREATE INDEX IF NOT EXISTS idx_daily_running_plan_user_date_time
+            ON daily_running_plan(user_id, plan_date, start_time_local, id)
             """
         )
+        cur.execute("DROP INDEX IF EXISTS idx_daily_running_plan_user_date")
 
         # coach_runner_links
         cur.execute(
@@ -225,6 +416,12 @@ class Repo:
             )
             """
         )
+        cur.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_coach_notes_runner_created
+            ON coach_notes(runner_id, created_at, id)
+            """
+        )
 
         # Strava credentials per runner
         cur.execute(
@@ -264,9 +461,106 @@ class Repo:
             )
             """
         )
+        cur.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_strava_imports_session
+            ON strava_activity_imports(session_id)
+            """
+        )
+        cur.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_strava_imports_user_start
+            ON strava_activity_imports(user_id, activity_start, imported_at)
+            """
+        )
+
+        # Users with a Strava sync queued or running. Kept in SQLite rather
+        # than in process memory so every worker sees the same claim.
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS strava_sync_state (
+                user_id TEXT PRIMARY KEY,
+                started_at INTEGER NOT NULL
+            )
+            """
+        )
+
+        # Per-user data version, shared by every worker process using this DB
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS user_data_versions (
+                user_id TEXT PRIMARY KEY,
+                version INTEGER NOT NULL DEFAULT 0
+            )
+            """
+        )
 
         self.conn.commit()
 
+    @staticmethod
+    def _ensure_runner_code_index(cur: sqlite3.Cursor) -> None:
+        """
+        Unique partial index on users.runner_code, so code lookups seek and
+        _insert_user can rely on the constraint. A legacy database that
+        already holds duplicate codes gets a plain index instead.
+        """
+        cur.execute("SAVEPOINT runner_code_index")
+        try:
+            cur.execute(
+                """
+                CREATE UNIQUE INDEX IF NOT EXISTS idx_users_runner_code
+                ON users(runner_code) WHERE runner_code IS NOT NULL
+                """
+            )
+        except sqlite3.IntegrityError:
+            cur.execute("ROLLBACK TO runner_code_index")
+            cur.execute(
+                """
+                CREATE INDEX IF NOT EXISTS idx_users_runner_code_dup
+                ON users(runner_code) WHERE runner_code IS NOT NULL
+                """
+            )
+        cur.execute("RELEASE runner_code_index")
+
+    @staticmethod
+    def _migrate_sessions_started_at_epoch(cur: sqlite3.Cursor) -> None:
+        """
+        Add and backfill sessions.started_at_epoch on databases created before
+        the column existed. Stats filter on the column, so a started_at that
+        fromisoformat rejects falls back to SQLite's own date parser, and any
+        row neither can read is logged rather than dropped silently.
+        """
+        cur.execute("PRAGMA table_info(sessions)")
+        if any(col["name"] == "started_at_epoch" for col in cur.fetchall()):
+            return
+        cur.execute("ALTER TABLE sessions ADD COLUMN started_at_epoch INTEGER")
+        cur.execute("SELECT id, started_at FROM sessions")
+        updates, unparsed = [], []
+        for row in cur.fetchall():
+            try:
+                updates.append((_iso_to_epoch(row["started_at"]), row["id"]))
+            except ValueError:
+                unparsed.append((row["id"],))
+        cur.executemany(
+            "UPDATE sessions SET started_at_epoch=? WHERE id=?", updates
+        )
+        if not unparsed:
+            return
+        cur.executemany(
+            """
+            UPDATE sessions
+            SET started_at_epoch = CAST(strftime('%s', started_at) AS INTEGER)
+            WHERE id=?
+            """,
+            unparsed,
+        )
+        cur.execute("SELECT id, started_at FROM sessions WHERE started_at_epoch IS NULL")
+        for row in cur.fetchall():
+            logging.warning(
+                f"session {row['id']} has an unreadable started_at {row['started_at']!r}; "
+                "it is left out of the stats until fixed"
+            )
+
     # ---------- users ----------
 
     def resolve_or_create_user(self, username: str, role: str) -> Dict[str, Any]:
@@ -281,15 +575,8 @@ class Repo:
 
         user_id = uuid.uuid4().hex
         now = _utcnow_iso()
-        runner_code = None
-        if role == "runner":
-            runner_code = self._generate_unique_runner_code()
-
-        cur.execute(
-            "INSERT INTO users(id, username, role, runner_code, created_at, password_hash) VALUES (?,?,?,?,?,?)",
-            (user_id, username, role, runner_code, now, None),
-      )
-        self.conn.commit()
+        with self.conn:
+            runner_code = self._insert_user(user_id, username, role, now, None)
         return {
             "id": user_id,
             "username": username,
@@ -314,20 +601,8 @@ class Repo:
 
         user_id = uuid.uuid4().hex
         now = _utcnow_iso()
-
-        runner_code = None
-        if role == "runner":
-            runner_code = self._generate_unique_runner_code()
-
-        cur = self.conn.cursor()
-        cur.execute(
-            """
-            INSERT INTO users(id, username, role, runner_code, created_at, password_hash)
-            VALUES (?,?,?,?,?,?)
-            """,
-            (user_id, username, role, runner_code, now, password_hash),
-        )
-        self.conn.commit()
+        with self.conn:
+            runner_code = self._insert_user(user_id, username, role, now, password_hash)
 
         return {
             "id": user_id,
@@ -338,82 +613,154 @@ class Repo:
         }
 
     def get_user_by_id(self, user_id: str) -> Optional[Dict[str, Any]]:
-        # Normalize to ensure it's a plain string
-        normalized = _text_id(user_id)
-        # SQLite requires plain Python strings, ensure we have one
-        if not isinstance(normalized, str):
-            normalized = str(normalized)
-        cur = self.conn.cursor()
-        # Use a list instead of tuple - some SQLite versions prefer this
-        cur.execute("SELECT * FROM users WHERE id=?", [normalized])
-        row = cur.fetchone()
+        user_id = _text_id(user_id)
+        with self._user_cache_lock:
+            cached = self._user_cache.get(user_id)
+            if cached is not None:
+                self._user_cache.move_to_end(user_id)
+                return dict(cached)
+        with self._read_conn() as conn:
+            row = conn.execute("SELECT * FROM users WHERE id=?", (user_id,)).fetchone()
+        if not row:
+            return None
+        user = dict(row)
+        with self._user_cache_lock:
+            self._user_cache[user_id] = user
+            if len(self._user_cache) > _USER_CACHE_MAX:
+                self._user_cache.popitem(last=False)
+        return dict(user)
+
+    def get_users_by_ids(self, user_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Fetch several users in one query; returns {id: user} for the ids found.
+        """
+        ids = list(dict.fromkeys(_text_id(u) for u in user_ids))
+        if not ids:
+            return {}
+        placeholders = ",".join("?" * len(ids))
+        with self._read_conn() as conn:
+            cur = conn.cursor()
+            cur.execute(f"SELECT * FROM users WHERE id IN ({placeholders})", ids)
+            return {row["id"]: dict(row) for row in cur}
+
+    def _write_returning(
+        self,
+        sql: str,
+        params: Tuple[Any, ...],
+        table: str,
+        row_id: str,
+        key: str = "id",
+        bump_user_id: Optional[str] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Run a single-row INSERT/UPDATE/upsert, commit, and return the written
+        row. Uses RETURNING * when available instead of a follow-up SELECT on
+        table.key = row_id (for upserts, key is the conflict column).
+        bump_user_id, if given, has its data version bumped in the same
+        transaction.
+        """
+        if _HAS_RETURNING:
+            with self.conn:
+                row = self.conn.execute(sql + " RETURNING *", params).fetchone()
+                if bump_user_id is not None:
+                    self._bump_version(bump_user_id)
+        else:
+            with self.conn:
+                self.conn.execute(sql, params)
+                if bump_user_id is not None:
+                    self._bump_version(bump_user_id)
+            row = self.conn.execute(
+                f"SELECT * FROM {table} WHERE {key}=?", (row_id,)
+            ).fetchone()
         return dict(row) if row else None
 
+    # ---------- data versions ----------
+
+    def get_user_data_version(self, user_id: str) -> int:
+        row = self.conn.execute(
+            "SELECT version FROM user_data_versions WHERE user_id=?",
+            (_text_id(user_id),),
+        ).fetchone()
+        return int(row["version"]) if row else 0
+
+    def bump_user_data_version(self, user_id: str) -> None:
+        with self.conn:
+            self._bump_version(user_id)
+
+    # The write methods below bump the owner's version inside their own
+    # transaction, so the data and its cache key change in the same commit.
+    def _bump_version(self, user_id: str) -> None:
+        self.conn.execute(
+            """
+            INSERT INTO user_data_versions(user_id, version) VALUES (?, 1)
+            ON CONFLICT(user_id) DO UPDATE SET version = version + 1
+            """,
+            (_text_id(user_id),),
+        )
+
+    def _bump_version_for_session(self, session_id: str) -> None:
+        self.conn.execute(
+            """
+            INSERT INTO user_data_versions(user_id, version)
+            SELECT user_id, 1 FROM sessions WHERE id=?
+            ON CONFLICT(user_id) DO UPDATE SET version = version + 1
+            """,
+            (session_id,),
+        )
+
     # ---------- settings ----------
 
     def get_or_create_user_settings(self, user_id: str) -> Dict[str, Any]:
-        # Normalize to ensure it's a plain string
         normalized = _text_id(user_id)
-        # SQLite requires plain Python strings, ensure we have one
-        if not isinstance(normalized, str):
-            normalized = str(normalized)
-        cur = self.conn.cursor()
-        # Use a list instead of tuple - some SQLite versions prefer this
-        cur.execute("SELECT * FROM user_settings WHERE user_id=?", [normalized])
-        row = cur.fetchone()
+        row = self.conn.execute(
+            "SELECT * FROM user_settings WHERE user_id=?", (normalized,)
+        ).fetchone()
         if row:
             return {
                 "user_id": row["user_id"],
                 "calories_per_hour": row["calories_per_hour"],
             }
 
-        try:
-            cur.execute(
-                "INSERT INTO user_settings(user_id, calories_per_hour) VALUES (?, ?)",
-                [normalized, 600.0],
+        # First read for this user: create the default row. OR IGNORE makes a
+        # concurrent creator harmless, and the SELECT returns whichever won.
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO user_settings(user_id, calories_per_hour) VALUES (?, ?)",
+                (normalized, 600.0),
             )
-            self.conn.commit()
-        except sqlite3.IntegrityError:
-            self.conn.rollback()
-            cur.execute("SELECT * FROM user_settings WHERE user_id=?", [normalized])
-            row = cur.fetchone()
-            if row:
-                return {
-                    "user_id": row["user_id"],
-                    "calories_per_hour": row["calories_per_hour"],
-                }
-            raise
-        return {"user_id": user_id, "calories_per_hour": 600.0}
+        row = self.conn.execute(
+            "SELECT * FROM user_settings WHERE user_id=?", (normalized,)
+        ).fetchone()
+        return {
+            "user_id": row["user_id"],
+            "calories_per_hour": row["calories_per_hour"],
+        }
 
     def update_user_calories_per_hour(self, user_id: str, value: float) -> Dict[str, Any]:
         user_id = _text_id(user_id)
-        cur = self.conn.cursor()
-        cur.execute(
-            """
-            INSERT INTO user_settings(user_id, calories_per_hour)
-            VALUES(?, ?)
-            ON CONFLICT(user_id) DO UPDATE SET calories_per_hour=excluded.calories_per_hour
-            """,
-            (user_id, value),
-        )
-        self.conn.commit()
+        with self.conn:
+            self.conn.execute(
+                """
+                INSERT INTO user_settings(user_id, calories_per_hour)
+                VALUES(?, ?)
+                ON CONFLICT(user_id) DO UPDATE SET calories_per_hour=excluded.calories_per_hour
+                """,
+                (user_id, value),
+            )
         return {"user_id": user_id, "calories_per_hour": value}
 
     # ---------- sessions / metrics ----------
 
     def get_active_session(self, user_id: str) -> Optional[Dict[str, Any]]:
-        user_id = _text_id(user_id)
-        cur = self.conn.cursor()
-        cur.execute(
+        row = self.conn.execute(
             """
             SELECT * FROM sessions
             WHERE user_id=? AND ended_at IS NULL
             ORDER BY started_at DESC
             LIMIT 1
             """,
-            (user_id,),
-        )
-        row = cur.fetchone()
+            (_text_id(user_id),),
+        ).fetchone()
         return dict(row) if row else None
 
     def create_active_session(
@@ -428,23 +775,26 @@ class Repo:
 
         sid = uuid.uuid4().hex
         now = _utcnow_iso()
-        cur = self.conn.cursor()
-        cur.execute(
+        return self._write_returning(
             """
             INSERT INTO sessions(
               id, user_id, started_at, ended_at,
               total_distance_km, total_duration_seconds, total_calories,
-              calories_per_hour, note
+              calories_per_hour, note, started_at_epoch
             )
-            VALUES (?, ?, ?, NULL, 0, 0, 0, ?, ?)
+            VALUES (?, ?, ?, NULL, 0, 0, 0, ?, ?, ?)
             """,
-            (sid, user_id, now, calories_per_hour, note),
+            (sid, user_id, now, calories_per_hour, note, _iso_to_epoch(now)),
+            "sessions",
+            sid,
+            bump_user_id=user_id,
         )
-        self.conn.commit()
-        cur.execute("SELECT * FROM sessions WHERE id=?", (sid,))
-        return dict(cur.fetchone())
 
     def _recalc_session_totals(self, session_id: str) -> None:
+        """
+        Rebuild a session's totals from its metrics. The write paths keep the
+        totals up to date incrementally; this is for repairing drifted rows.
+        """
         cur = self.conn.cursor()
         cur.execute(
             "SELECT SUM(distance) AS dist, SUM(duration_seconds) AS dur FROM metrics WHERE session_id=?",
@@ -477,19 +827,86 @@ class Repo:
         end_time: Optional[str],
     ) -> Dict[str, Any]:
         mid = uuid.uuid4().hex
+        # Insert and apply the delta to the session totals in one transaction;
+        # _recalc_session_totals (a full re-sum) is only needed for batches
+        with self.conn:
+            self.conn.execute(
+                """
+                INSERT INTO metrics(id, session_id, distance, duration_seconds, start_time, end_time)
+                VALUES (?,?,?,?,?,?)
+                """,
+                (mid, session_id, distance_km, duration_seconds, start_time, end_time),
+            )
+            self.conn.execute(
+                """
+                UPDATE sessions
+                SET total_distance_km = total_distance_km + ?,
+                    total_duration_seconds = total_duration_seconds + ?,
+                    total_calories = (total_duration_seconds + ?) * calories_per_hour / 3600.0
+                WHERE id=?
+                """,
+                (distance_km, duration_seconds, duration_seconds, session_id),
+            )
+            self._bump_version_for_session(session_id)
+
+        return {
+            "id": mid,
+            "session_id": session_id,
+            "distance": distance_km,
+            "duration_seconds": duration_seconds,
+            "start_time": start_time,
+            "end_time": end_time,
+        }
+
+    def add_metrics_bulk(
+        self,
+        session_id: str,
+        distances_km: List[float],
+        durations_seconds: List[int],
+    ) -> Dict[str, Any]:
+        """
+        Insert many metric samples for a session and add their sums to the
+        session totals, all in one transaction.
+        """
+        rows = [
+            (uuid.uuid4().hex, session_id, float(dist), int(dur), None, None)
+            for dist, dur in zip(distances_km, durations_seconds)
+        ]
+        added_dist = sum(r[2] for r in rows)
+        added_dur = sum(r[3] for r in rows)
         cur = self.conn.cursor()
+        with self.conn:
+            cur.executemany(
+                """
+                INSERT INTO metrics(id, session_id, distance, duration_seconds, start_time, end_time)
+                VALUES (?,?,?,?,?,?)
+                """,
+                rows,
+            )
+            cur.execute(
+                """
+                UPDATE sessions
+                SET total_distance_km = total_distance_km + ?,
+                    total_duration_seconds = total_duration_seconds + ?,
+                    total_calories = (total_duration_seconds + ?) * calories_per_hour / 3600.0
+                WHERE id=?
+                """,
+                (added_dist, added_dur, added_dur, session_id),
+            )
+            self._bump_version_for_session(session_id)
+
         cur.execute(
             """
-            INSERT INTO metrics(id, session_id, distance, duration_seconds, start_time, end_time)
-            VALUES (?,?,?,?,?,?)
+            SELECT total_distance_km, total_duration_seconds, total_calories
+            FROM sessions
+            WHERE id=?
             """,
-            (mid, session_id, distance_km, duration_seconds, start_time, end_time),
+            (session_id,),
         )
-        self.conn.commit()
-        self._recalc_session_totals(session_id)
-
-        cur.execute("SELECT * FROM metrics WHERE id=?", (mid,))
-        return dict(cur.fetchone())
+        totals = dict(cur.fetchone())
+        totals["session_id"] = session_id
+        totals["inserted"] = len(rows)
+        return totals
 
     def finish_session(
         self,
@@ -500,7 +917,7 @@ class Repo:
         cur = self.conn.cursor()
         cur.execute(
             """
-            SELECT started_at, total_duration_seconds, calories_per_hour, total_distance_km
+            SELECT user_id, started_at, total_duration_seconds, calories_per_hour, total_distance_km
             FROM sessions
             WHERE id=?
             """,
@@ -521,10 +938,7 @@ class Repo:
         else:
             # Keep the original "from start until now" fallback logic
             if dur == 0 and started_at:
-                start_str = started_at.rstrip("Z")
-                start_dt = datetime.fromisoformat(start_str)
-                now_dt = datetime.utcnow()
-                dur = int(max(0, (now_dt - start_dt).total_seconds()))
+                dur = int(max(0, time.time() - _iso_to_epoch(started_at)))
 
         total_hours = dur / 3600.0
         total_cal = total_hours * cph
@@ -532,7 +946,7 @@ class Repo:
 
         new_dist = total_distance_km if total_distance_km is not None else old_dist
 
-        cur.execute(
+        return self._write_returning(
             """
             UPDATE sessions
             SET total_distance_km=?,
@@ -542,50 +956,84 @@ class Repo:
             WHERE id=?
             """,
             (new_dist, dur, total_cal, ended_at, session_id),
+            "sessions",
+            session_id,
+            bump_user_id=row["user_id"],
         )
 
-        self.conn.commit()
-        cur.execute("SELECT * FROM sessions WHERE id=?", (session_id,))
-        return dict(cur.fetchone())
-
     # ---------- history ----------
 
-    def fetch_history_by_user_id(self, user_id: str, limit: int) -> Dict[str, Any]:
-        # Normalize to ensure it's a plain string
-        normalized = _text_id(user_id)
-        # SQLite requires plain Python strings, ensure we have one
-        if not isinstance(normalized, str):
-            normalized = str(normalized)
-        cur = self.conn.cursor()
-        cur.execute("SELECT * FROM users WHERE id=?", [normalized])
-        user = cur.fetchone()
-        if not user:
-            return {
-                "user_id": None,
-                "username": None,
-                "count": 0,
-                "sessions": [],
-            } #Dashboard Data
-
-        cur.execute(
+    def list_sessions_summary(
+        self, user_id: str, limit: int, offset: int = 0
+    ) -> List[Dict[str, Any]]:
+        """
+        One page of the user's sessions, newest first, with only the
+        denormalized totals (no metrics) for list views.
+        """
+        rows = self.conn.execute(
             """
-            SELECT * FROM sessions
+            SELECT id, started_at, ended_at,
+                   total_distance_km, total_duration_seconds, total_calories
+            FROM sessions
             WHERE user_id=?
             ORDER BY started_at DESC
-            LIMIT ?
+            LIMIT ? OFFSET ?
             """,
-            [normalized, limit],
+            (_text_id(user_id), limit, offset),
         )
-        sessions_rows = cur.fetchall()
+        return [dict(r) for r in rows]
+
+    def fetch_history_by_user_id(
+        self, user_id: str, limit: int, include_metrics: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Return the user's most recent sessions. With include_metrics=False the
+        metrics query is skipped and every session gets an empty list.
+        """
+        user_id = _text_id(user_id)
+        with self._read_conn() as conn:
+            user = conn.execute(
+                "SELECT id, username FROM users WHERE id=?", (user_id,)
+            ).fetchone()
+            if not user:
+                return {
+                    "user_id": None,
+                    "username": None,
+                    "count": 0,
+                    "sessions": [],
+                } #Dashboard Data
+
+            sessions_rows = conn.execute(
+                """
+                SELECT id, started_at, ended_at, total_distance_km,
+                       total_duration_seconds, total_calories, calories_per_hour
+                FROM sessions
+                WHERE user_id=?
+                ORDER BY started_at DESC
+                LIMIT ?
+                """,
+                (user_id, limit),
+            ).fetchall()
+
+            # All metrics for the page of sessions in one query, bucketed by session
+            metrics_by_sid: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+            sids = [s["id"] for s in sessions_rows]
+            if sids and include_metrics:
+                placeholders = ",".join("?" * len(sids))
+                metric_rows = conn.execute(
+                    f"""
+                    SELECT * FROM metrics
+                    WHERE session_id IN ({placeholders})
+                    ORDER BY session_id, id
+                    """,
+                    sids,
+                )
+                for m in metric_rows:
+                    metrics_by_sid[m["session_id"]].append(dict(m))
+
         sessions: List[Dict[str, Any]] = []
         for s in sessions_rows:
-            sid = s["id"]
-            cur.execute(
-                "SELECT * FROM metrics WHERE session_id=? ORDER BY id",
-                (sid,),
-            )
-            metrics_rows = cur.fetchall()
-            metrics = [dict(m) for m in metrics_rows]
+            metrics = metrics_by_sid.get(s["id"], [])
             sessions.append(
                 {
                     "id": s["id"],
@@ -606,6 +1054,33 @@ class Repo:
             "sessions": sessions,
         }
 
+    def fetch_overall_stats_for_prompt(
+        self, user_id: str, limit: int
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Distance total and session count over the user's `limit` most recent
+        sessions, aggregated in SQL; None when the user does not exist.
+        """
+        user_id = _text_id(user_id)
+        with self._read_conn() as conn:
+            row = conn.execute(
+                """
+                SELECT u.id, u.username,
+                       (SELECT COALESCE(SUM(total_distance_km), 0.0)
+                        FROM (SELECT total_distance_km FROM sessions
+                              WHERE user_id = u.id
+                              ORDER BY started_at DESC LIMIT ?)) AS total_distance_km,
+                       (SELECT COUNT(*)
+                        FROM (SELECT 1 FROM sessions
+                              WHERE user_id = u.id
+                              ORDER BY started_at DESC LIMIT ?)) AS total_sessions
+                FROM users u
+                WHERE u.id=?
+                """,
+                (limit, limit, user_id),
+            ).fetchone()
+            return dict(row) if row else None
+
     def fetch_recent_for_prompt_by_user_id(self, user_id: str, last_n: int) -> Dict[str, Any]:
         return self.fetch_history_by_user_id(user_id, last_n)
 #Strava Dashboard
@@ -624,30 +1099,46 @@ class Repo:
         user_id = _text_id(user_id)
         plan_id = uuid.uuid4().hex
         now = _utcnow_iso()
-        cur = self.conn.cursor()
-        cur.execute(
-            """
-            INSERT INTO plans(
-              id, user_id, name, goal_type, target_event_date,
-              meta_json, created_by_ai, created_at
-            )
-            VALUES(?,?,?,?,?,?,?,?)
-            """,
+        rows = [
             (
+                uuid.uuid4().hex,
                 plan_id,
-                user_id,
-                name,
-                goal_type,
-                target_event_date,
-                json.dumps(meta_json) if meta_json is not None else None,
-                1 if created_by_ai else 0,
-                now,
-            ),
-        )
+                e.get("day_index", 0),
+                e.get("date"),
+                e.get("focus"),
+                e.get("target_distance_km"),
+                e.get("target_duration_seconds"),
+                e.get("intensity"),
+                e.get("warmup_text"),
+                e.get("workout_text"),
+                e.get("cooldown_text"),
+                e.get("nutrition_text"),
+                e.get("notes"),
+            )
+            for e in entries
+        ]
 
-        for e in entries:
-            pe_id = uuid.uuid4().hex
-            cur.execute(
+        with self.conn:
+            self.conn.execute(
+                """
+                INSERT INTO plans(
+                  id, user_id, name, goal_type, target_event_date,
+                  meta_json, created_by_ai, created_at
+                )
+                VALUES(?,?,?,?,?,?,?,?)
+                """,
+                (
+                    plan_id,
+                    user_id,
+                    name,
+                    goal_type,
+                    target_event_date,
+                    json.dumps(meta_json) if meta_json is not None else None,
+                    1 if created_by_ai else 0,
+                    now,
+                ),
+            )
+            self.conn.executemany(
                 """
                 INSERT INTO plan_entries(
                   id, plan_id, day_index, date, focus,
@@ -658,151 +1149,137 @@ class Repo:
                 )
                 VALUES(?,?,?,?,?,?,?,?,?,?,?,?,?,NULL)
                 """,
-                (
-                    pe_id,
-                    plan_id,
-                    e.get("day_index", 0),
-                    e.get("date"),
-                    e.get("focus"),
-                    e.get("target_distance_km"),
-                    e.get("target_duration_seconds"),
-                    e.get("intensity"),
-                    e.get("warmup_text"),
-                    e.get("workout_text"),
-                    e.get("cooldown_text"),
-                    e.get("nutrition_text"),
-                    e.get("notes"),
-                ),
+                rows,
             )
-
-        self.conn.commit()
         return self.get_plan_with_entries(plan_id)
 
     def list_plans_by_user_id(self, user_id: str, limit: int) -> List[Dict[str, Any]]:
         user_id = _text_id(user_id)
-        cur = self.conn.cursor()
-        cur.execute(
-            """
-            SELECT * FROM plans
-            WHERE user_id=?
-            ORDER BY created_at DESC
-            LIMIT ?
-            """,
-            (user_id, limit),
-        )
-        return [dict(p) for p in cur.fetchall()]
+        # List view: meta_json can be large and is only needed for a single plan
+        with self._read_conn() as conn:
+            rows = conn.execute(
+                """
+                SELECT id, user_id, name, goal_type, target_event_date,
+                       created_by_ai, created_at
+                FROM plans
+                WHERE user_id=?
+                ORDER BY created_at DESC
+                LIMIT ?
+                """,
+                (user_id, limit),
+            )
+            return [dict(p) for p in rows]
 
     def get_plan_with_entries(self, plan_id: str) -> Optional[Dict[str, Any]]:
-        cur = self.conn.cursor()
-        cur.execute("SELECT * FROM plans WHERE id=?", (plan_id,))
-        p = cur.fetchone()
-        if not p:
-            return None
-        cur.execute(
-            "SELECT * FROM plan_entries WHERE plan_id=? ORDER BY day_index, id",
-            (plan_id,),
-        )
-        entries = [dict(e) for e in cur.fetchall()]
-        plan = dict(p)
-        if plan.get("meta_json"):
-            try:
-                plan["meta_json"] = json.loads(plan["meta_json"])
-            except Exception:
-                pass
-        plan["entries"] = entries
-        return plan
+        with self._read_conn() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT * FROM plans WHERE id=?", (plan_id,))
+            p = cur.fetchone()
+            if not p:
+                return None
+            cur.execute(
+                "SELECT * FROM plan_entries WHERE plan_id=? ORDER BY day_index, id",
+                (plan_id,),
+            )
+            entries = [dict(e) for e in cur]
+            plan = dict(p)
+            if plan.get("meta_json"):
+                try:
+                    plan["meta_json"] = json.loads(plan["meta_json"])
+                except Exception:
+                    pass
+            plan["entries"] = entries
+            return plan
 
     def link_plan_entry_to_session(self, plan_entry_id: str, session_id: str) -> Dict[str, Any]:
-        cur = self.conn.cursor()
-        cur.execute(
+        return self._write_returning(
             "UPDATE plan_entries SET linked_session_id=? WHERE id=?",
             (session_id, plan_entry_id),
+            "plan_entries",
+            plan_entry_id,
         )
-        self.conn.commit()
-        cur.execute("SELECT * FROM plan_entries WHERE id=?", (plan_entry_id,))
-        return dict(cur.fetchone())
 
     # ---------- stats helpers ----------
 
+    @staticmethod
+    def _strava_join(only_strava: bool) -> str:
+        # Restricts `sessions s` to Strava imports; each import owns exactly
+        # one session, so the join never duplicates rows
+        if only_strava:
+            return "JOIN strava_activity_imports sai ON sai.session_id = s.id"
+        return ""
+
     def stats_overview(
         self, user_id: str, since_iso: str, only_strava: bool = False
     ) -> Dict[str, Any]:
         user_id = _text_id(user_id)
-        cur = self.conn.cursor()
-        query = """
-            SELECT
-              COUNT(*) AS total_sessions,
-              COALESCE(SUM(total_distance_km), 0) AS total_distance_km,
-              COALESCE(SUM(total_duration_seconds), 0) AS total_duration_seconds
-            FROM sessions
-            WHERE user_id=? AND started_at>=?
-        """
-        params: List[Any] = [user_id, since_iso]
-        if only_strava:
-            query += """
-            AND EXISTS (
-                SELECT 1 FROM strava_activity_imports sai
-                WHERE sai.session_id = sessions.id
-            )
-            """
-        cur.execute(query, params)
-        row = cur.fetchone()
-        return {
-            "total_sessions": row["total_sessions"],
-            "total_distance_km": row["total_distance_km"],
-            "total_duration_seconds": row["total_duration_seconds"],
-        }
+        with self._read_conn() as conn:
+            row = conn.execute(
+                f"""
+                SELECT
+                  COUNT(*) AS total_sessions,
+                  COALESCE(SUM(s.total_distance_km), 0) AS total_distance_km,
+                  COALESCE(SUM(s.total_duration_seconds), 0) AS total_duration_seconds
+                FROM sessions s
+                {self._strava_join(only_strava)}
+                WHERE s.user_id=? AND s.started_at_epoch>=?
+                """,
+                (user_id, _iso_to_epoch(since_iso)),
+            ).fetchone()
+            return {
+                "total_sessions": row["total_sessions"],
+                "total_distance_km": row["total_distance_km"],
+                "total_duration_seconds": row["total_duration_seconds"],
+            }
 
     def stats_daily(
         self, user_id: str, since_iso: str, only_strava: bool = False
     ) -> List[Dict[str, Any]]:
         user_id = _text_id(user_id)
-        cur = self.conn.cursor()
-        query = """
-            SELECT
-              substr(started_at, 1, 10) AS date,
-              COUNT(*) AS sessions,
-              COALESCE(SUM(total_distance_km), 0) AS distance_km,
-              COALESCE(SUM(total_duration_seconds), 0) AS duration_seconds
-            FROM sessions
-            WHERE user_id=? AND started_at>=?
-            GROUP BY date
-            ORDER BY date
-        """
-        params: List[Any] = [user_id, since_iso]
-        if only_strava:
-            query += """
-            AND EXISTS (
-                SELECT 1 FROM strava_activity_imports sai
-                WHERE sai.session_id = sessions.id
+        with self._read_conn() as conn:
+            rows = conn.execute(
+                f"""
+                SELECT
+                  s.started_at_epoch / 86400 AS day,
+                  COUNT(*) AS sessions,
+                  COALESCE(SUM(s.total_distance_km), 0) AS distance_km,
+                  COALESCE(SUM(s.total_duration_seconds), 0) AS duration_seconds
+                FROM sessions s
+                {self._strava_join(only_strava)}
+                WHERE s.user_id=? AND s.started_at_epoch>=?
+                GROUP BY day
+                ORDER BY day
+                """,
+                (user_id, _iso_to_epoch(since_iso)),
             )
-            """
-        cur.execute(query, params)
-        return [dict(r) for r in cur.fetchall()]
+            return [
+                {
+                    "date": _epoch_day_to_date(r["day"]),
+                    "sessions": r["sessions"],
+                    "distance_km": r["distance_km"],
+                    "duration_seconds": r["duration_seconds"],
+                }
+                for r in rows
+            ]
 
     def stats_sessions_since(
         self, user_id: str, since_iso: str, only_strava: bool = False
     ) -> List[Dict[str, Any]]:
         user_id = _text_id(user_id)
-        cur = self.conn.cursor()
-        query = """
-            SELECT
-              id, user_id, started_at,
-              total_distance_km, total_duration_seconds, total_calories
-            FROM sessions
-            WHERE user_id=? AND started_at>=?
-            ORDER BY started_at
-        """
-        params: List[Any] = [user_id, since_iso]
-        if only_strava:
-            query += """
-            AND EXISTS (
-                SELECT 1 FROM strava_activity_imports sai
-                WHERE sai.session_id = sessions.id
+        with self._read_conn() as conn:
+            rows = conn.execute(
+                f"""
+                SELECT
+                  s.id, s.user_id, s.started_at, s.started_at_epoch,
+                  s.total_distance_km, s.total_duration_seconds, s.total_calories
+                FROM sessions s
+                {self._strava_join(only_strava)}
+                WHERE s.user_id=? AND s.started_at_epoch>=?
+                ORDER BY s.started_at_epoch
+                """,
+                (user_id, _iso_to_epoch(since_iso)),
             )
-            """
-        cur.execute(query, params)
-        return [dict(r) for r in cur.fetchall()]
+            return [dict(r) for r in rows]
 
     def fetch_sessions_between(
         self,
@@ -811,28 +1288,18 @@ class Repo:
         end_iso: str,
         only_strava: bool = False,
     ) -> List[Dict[str, Any]]:
-        # Normalize to ensure it's a plain string
         normalized = _text_id(user_id)
-        # SQLite requires plain Python strings, ensure we have one
-        if not isinstance(normalized, str):
-            normalized = str(normalized)
-        cur = self.conn.cursor()
-        query = """
-            SELECT * FROM sessions
-            WHERE user_id=? AND started_at>=? AND started_at<?
-            ORDER BY started_at
-        """
-        # Ensure all params are proper strings
-        params: List[Any] = [normalized, str(start_iso), str(end_iso)]
-        if only_strava:
-            query += """
-            AND EXISTS (
-                SELECT 1 FROM strava_activity_imports sai
-                WHERE sai.session_id = sessions.id
+        with self._read_conn() as conn:
+            rows = conn.execute(
+                f"""
+                SELECT s.* FROM sessions s
+                {self._strava_join(only_strava)}
+                WHERE s.user_id=? AND s.started_at_epoch>=? AND s.started_at_epoch<?
+                ORDER BY s.started_at_epoch
+                """,
+                (normalized, _iso_to_epoch(start_iso), _iso_to_epoch(end_iso)),
             )
-            """
-        cur.execute(query, params)
-        return [dict(r) for r in cur.fetchall()]
+            return [dict(r) for r in rows]
 
     def fetch_daily_aggregates_between(
         self,
@@ -842,29 +1309,33 @@ class Repo:
         only_strava: bool = False,
     ) -> List[Dict[str, Any]]:
         user_id = _text_id(user_id)
-        cur = self.conn.cursor()
-        query = """
-            SELECT
-              substr(started_at, 1, 10) AS date,
-              COUNT(*) AS sessions,
-              COALESCE(SUM(total_distance_km), 0) AS total_distance_km,
-              COALESCE(SUM(total_duration_seconds), 0) AS total_duration_seconds,
-              COALESCE(SUM(total_calories), 0) AS total_calories
-            FROM sessions
-            WHERE user_id=? AND started_at>=? AND started_at<?
-            GROUP BY date
-            ORDER BY date
-        """
-        params: List[Any] = [user_id, start_iso, end_iso]
-        if only_strava:
-            query += """
-            AND EXISTS (
-                SELECT 1 FROM strava_activity_imports sai
-                WHERE sai.session_id = sessions.id
+        with self._read_conn() as conn:
+            rows = conn.execute(
+                f"""
+                SELECT
+                  s.started_at_epoch / 86400 AS day,
+                  COUNT(*) AS sessions,
+                  COALESCE(SUM(s.total_distance_km), 0) AS total_distance_km,
+                  COALESCE(SUM(s.total_duration_seconds), 0) AS total_duration_seconds,
+                  COALESCE(SUM(s.total_calories), 0) AS total_calories
+                FROM sessions s
+                {self._strava_join(only_strava)}
+                WHERE s.user_id=? AND s.started_at_epoch>=? AND s.started_at_epoch<?
+                GROUP BY day
+                ORDER BY day
+                """,
+                (user_id, _iso_to_epoch(start_iso), _iso_to_epoch(end_iso)),
             )
-            """
-        cur.execute(query, params)
-        return [dict(r) for r in cur.fetchall()]
+            return [
+                {
+                    "date": _epoch_day_to_date(r["day"]),
+                    "sessions": r["sessions"],
+                    "total_distance_km": r["total_distance_km"],
+                    "total_duration_seconds": r["total_duration_seconds"],
+                    "total_calories": r["total_calories"],
+                }
+                for r in rows
+            ]
 
     # ---------- weekly plan rule (legacy interface) ----------
 
@@ -911,14 +1382,9 @@ class Repo:
         duration_minutes: int,
         distance_km: float,
     ) -> Dict[str, Any]:
-        # Normalize to ensure it's a plain string
         normalized = _text_id(user_id)
-        # SQLite requires plain Python strings, ensure we have one
-        if not isinstance(normalized, str):
-            normalized = str(normalized)
         now = _utcnow_iso()
-        cur = self.conn.cursor()
-        cur.execute(
+        return self._write_returning(
             """
             INSERT INTO weekly_plan_rules(
               id, user_id, weekday, start_time,
@@ -933,10 +1399,10 @@ class Repo:
               updated_at=excluded.updated_at
             """,
             (uuid.uuid4().hex, normalized, weekday, start_time, duration_minutes, distance_km, now, now),
+            "weekly_plan_rules",
+            normalized,
+            key="user_id",
         )
-        self.conn.commit()
-        cur.execute("SELECT * FROM weekly_plan_rules WHERE user_id=?", [normalized])
-        return dict(cur.fetchone())
 
     # ---------- daily running plan ----------
 
@@ -953,15 +1419,8 @@ class Repo:
         user_id = _text_id(user_id)
         pid = uuid.uuid4().hex
         now = _utcnow_iso()
-        cur = self.conn.cursor()
-        cur.execute(
-            """
-            INSERT INTO daily_running_plan(
-              id, user_id, plan_date, start_time_local,
-              duration_minutes, distance_km, activity, description, created_at
-            )
-            VALUES(?,?,?,?,?,?,?,?,?)
-            """,
+        return self._write_returning(
+            _INSERT_DAILY_PLAN_SQL,
             (
                 pid,
                 user_id,
@@ -973,19 +1432,61 @@ class Repo:
                 description,
                 now,
             ),
+            "daily_running_plan",
+            pid,
+            bump_user_id=user_id,
         )
-        self.conn.commit()
-        cur.execute("SELECT * FROM daily_running_plan WHERE id=?", (pid,))
-        return dict(cur.fetchone())
 
-    def delete_daily_plan(self, user_id: str, plan_id: str) -> None:
+    def create_daily_plans_bulk(
+        self,
+        user_id: str,
+        plan_dates: List[str],
+        start_time_local: str,
+        duration_minutes: int,
+        distance_km: float,
+        activity: Optional[str],
+        description: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Insert the same plan slot on each of plan_dates in one transaction and
+        return the rows written, in plan_dates order.
+        """
         user_id = _text_id(user_id)
-        cur = self.conn.cursor()
-        cur.execute(
-            "DELETE FROM daily_running_plan WHERE id=? AND user_id=?",
-            (plan_id, user_id),
+        now = _utcnow_iso()
+        # Coerced to the column affinities so the returned dicts match a reread
+        rows = [
+            (
+                uuid.uuid4().hex,
+                user_id,
+                plan_date,
+                start_time_local,
+                int(duration_minutes),
+                float(distance_km),
+                activity,
+                description,
+                now,
+            )
+            for plan_date in plan_dates
+        ]
+        if rows:
+            with self.conn:
+                self.conn.executemany(_INSERT_DAILY_PLAN_SQL, rows)
+                self._bump_version(user_id)
+        columns = (
+            "id", "user_id", "plan_date", "start_time_local",
+            "duration_minutes", "distance_km", "activity", "description", "created_at",
         )
-        self.conn.commit()
+        return [dict(zip(columns, row)) for row in rows]
+
+    def delete_daily_plan(self, user_id: str, plan_id: str) -> None:
+        user_id = _text_id(user_id)
+        with self.conn:
+            cur = self.conn.execute(
+                "DELETE FROM daily_running_plan WHERE id=? AND user_id=?",
+                (plan_id, user_id),
+            )
+            if cur.rowcount:
+                self._bump_version(user_id)
 
     def list_daily_plans_for_month(
         self,
@@ -994,16 +1495,17 @@ class Repo:
         end_date: str,
     ) -> List[Dict[str, Any]]:
         user_id = _text_id(user_id)
-        cur = self.conn.cursor()
-        cur.execute(
-            """
-            SELECT * FROM daily_running_plan
-            WHERE user_id=? AND plan_date>=? AND plan_date<?
-            ORDER BY plan_date, start_time_local, id
-            """,
-            (user_id, start_date, end_date),
-        )
-        return [dict(r) for r in cur.fetchall()]
+        with self._read_conn() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                """
+                SELECT * FROM daily_running_plan
+                WHERE user_id=? AND plan_date>=? AND plan_date<?
+                ORDER BY plan_date, start_time_local, id
+                """,
+                (user_id, start_date, end_date),
+            )
+            return [dict(r) for r in cur]
 
     def list_daily_plans_for_date(
         self,
@@ -1011,27 +1513,77 @@ class Repo:
         date_str: str,
     ) -> List[Dict[str, Any]]:
         user_id = _text_id(user_id)
-        cur = self.conn.cursor()
-        cur.execute(
-            """
-            SELECT * FROM daily_running_plan
-            WHERE user_id=? AND plan_date=?
-            ORDER BY start_time_local, id
-            """,
-            (user_id, date_str),
-        )
-        return [dict(r) for r in cur.fetchall()]
+        with self._read_conn() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                """
+                SELECT * FROM daily_running_plan
+                WHERE user_id=? AND plan_date=?
+                ORDER BY start_time_local, id
+                """,
+                (user_id, date_str),
+            )
+            return [dict(r) for r in cur]
 
     # ---------- runner code & coach <-> runner ----------
 
-    def _generate_unique_runner_code(self) -> int:
+    def _insert_user(
+        self,
+        user_id: str,
+        username: str,
+        role: str,
+        now: str,
+        password_hash: Optional[str],
+    ) -> Optional[int]:
+        """
+        Insert a user row and return its runner_code (None for coaches).
+        Runner codes are drawn at random and the unique index decides whether
+        a draw is free, so there is no check-then-insert race. Codes stay
+        random (coaches bind runners by code, so they must not be guessable);
+        once a few blind draws collide, the next draw is picked from the
+        codes that are actually free.
+        """
         cur = self.conn.cursor()
-        for _ in range(50):
-            code = random.randint(1, 10000)
-            cur.execute("SELECT 1 FROM users WHERE runner_code=?", (code,))
-            if not cur.fetchone():
+        sql = """
+            INSERT INTO users(id, username, role, runner_code, created_at, password_hash)
+            VALUES (?,?,?,?,?,?)
+        """
+        if role != "runner":
+            cur.execute(sql, (user_id, username, role, None, now, password_hash))
+            return None
+        for attempt in range(_RUNNER_CODE_ATTEMPTS):
+            if attempt < _RUNNER_CODE_BLIND_DRAWS:
+                code = random.randint(1, _RUNNER_CODE_MAX)
+            else:
+                code = self._random_free_runner_code()
+                if code is None:
+                    break
+            try:
+                cur.execute(sql, (user_id, username, role, code, now, password_hash))
                 return code
-        raise ValueError("No available runner_code in range 1–10000")
+            except sqlite3.IntegrityError as e:
+                if "runner_code" not in str(e):
+                    raise
+        raise ValueError(f"No available runner_code in range 1–{_RUNNER_CODE_MAX}")
+
+    def _random_free_runner_code(self) -> Optional[int]:
+        """
+        Pick a random unused runner code in one statement: each candidate is
+        a seek on idx_users_runner_code. None when every code is taken.
+        """
+        row = self.conn.execute(
+            """
+            WITH RECURSIVE n(code) AS (
+                SELECT 1 UNION ALL SELECT code + 1 FROM n WHERE code < ?
+            )
+            SELECT code FROM n
+            WHERE NOT EXISTS (SELECT 1 FROM users WHERE runner_code = n.code)
+            ORDER BY random()
+            LIMIT 1
+            """,
+            (_RUNNER_CODE_MAX,),
+        ).fetchone()
+        return row["code"] if row else None
 
     def get_user_by_runner_code(self, code: int) -> Optional[Dict[str, Any]]:
         cur = self.conn.cursor()
@@ -1071,7 +1623,7 @@ class Repo:
             """,
             (coach_id,),
         )
-        return [dict(r) for r in cur.fetchall()]
+        return [dict(r) for r in cur]
 
     # ---------- coach notes ----------
 
@@ -1084,8 +1636,7 @@ class Repo:
     ) -> Dict[str, Any]:
         note_id = uuid.uuid4().hex
         now = _utcnow_iso()
-        cur = self.conn.cursor()
-        cur.execute(
+        return self._write_returning(
             """
             INSERT INTO coach_notes(
               id, runner_id, coach_id, coach_name, content, created_at
@@ -1093,10 +1644,9 @@ class Repo:
             VALUES (?,?,?,?,?,?)
             """,
             (note_id, runner_id, coach_id, coach_name, content, now),
+            "coach_notes",
+            note_id,
         )
-        self.conn.commit()
-        cur.execute("SELECT * FROM coach_notes WHERE id=?", (note_id,))
-        return dict(cur.fetchone())
 
     def list_coach_notes_for_runner(self, runner_id: str) -> List[Dict[str, Any]]:
         runner_id = _text_id(runner_id)
@@ -1109,7 +1659,7 @@ class Repo:
             """,
             (runner_id,),
         )
-        return [dict(r) for r in cur.fetchall()]
+        return [dict(r) for r in cur]
 
     # ---------- Strava integration ----------
 
@@ -1124,8 +1674,7 @@ class Repo:
     ) -> Dict[str, Any]:
         user_id = _text_id(user_id)
         now = _utcnow_iso()
-        cur = self.conn.cursor()
-        cur.execute(
+        return self._write_returning(
             """
             INSERT INTO strava_credentials(
                 user_id, athlete_id, access_token, refresh_token,
@@ -1142,20 +1691,15 @@ class Repo:
                 updated_at=excluded.updated_at
             """,
             (user_id, athlete_id, access_token, refresh_token, expires_at, scope, now, now),
+            "strava_credentials",
+            user_id,
+            key="user_id",
         )
-        self.conn.commit()
-        return self.get_strava_credentials(user_id)
 
     def get_strava_credentials(self, user_id: str) -> Optional[Dict[str, Any]]:
-        # Normalize to ensure it's a plain string
-        normalized = _text_id(user_id)
-        # SQLite requires plain Python strings, ensure we have one
-        if not isinstance(normalized, str):
-            normalized = str(normalized)
-        cur = self.conn.cursor()
-        # Use a list instead of tuple - some SQLite versions prefer this
-        cur.execute("SELECT * FROM strava_credentials WHERE user_id=?", [normalized])
-        row = cur.fetchone()
+        row = self.conn.execute(
+            "SELECT * FROM strava_credentials WHERE user_id=?", (_text_id(user_id),)
+        ).fetchone()
         return dict(row) if row else None
 
     def update_strava_tokens(
@@ -1195,6 +1739,39 @@ class Repo:
         )
         self.conn.commit()
 
+    def claim_strava_sync(self, user_id: str, stale_after_seconds: int) -> bool:
+        """
+        Mark a Strava sync for this user as in progress. Returns False while
+        another claim is held; a claim older than stale_after_seconds (a
+        worker that died mid-sync) is taken over.
+        """
+        now = int(time.time())
+        with self.conn:
+            cur = self.conn.execute(
+                """
+                INSERT INTO strava_sync_state(user_id, started_at) VALUES (?, ?)
+                ON CONFLICT(user_id) DO UPDATE SET started_at=excluded.started_at
+                WHERE strava_sync_state.started_at < ?
+                """,
+                (_text_id(user_id), now, now - stale_after_seconds),
+            )
+        return cur.rowcount == 1
+
+    def release_strava_sync(self, user_id: str) -> None:
+        with self.conn:
+            self.conn.execute(
+                "DELETE FROM strava_sync_state WHERE user_id=?", (_text_id(user_id),)
+            )
+
+    def is_strava_sync_in_progress(self, user_id: str, stale_after_seconds: int) -> bool:
+        # A stale claim is one claim_strava_sync would take over, so it is
+        # not reported as running
+        row = self.conn.execute(
+            "SELECT 1 FROM strava_sync_state WHERE user_id=? AND started_at >= ?",
+            (_text_id(user_id), int(time.time()) - stale_after_seconds),
+        ).fetchone()
+        return row is not None
+
     def has_imported_strava_activity(self, user_id: str, activity_id: int) -> bool:
         user_id = _text_id(user_id)
         cur = self.conn.cursor()
@@ -1236,7 +1813,7 @@ class Repo:
                 activity_start,
                 distance_km,
                 moving_time,
-                json.dumps(payload) if payload is not None else None,
+                orjson.dumps(payload).decode() if payload is not None else None,
                 _utcnow_iso(),
             ),
         )
@@ -1244,49 +1821,58 @@ class Repo:
 
     def fetch_recent_strava_runs(self, user_id: str, limit: int) -> List[Dict[str, Any]]:
         user_id = _text_id(user_id)
-        cur = self.conn.cursor()
-        cur.execute(
-            """
-            SELECT
-                sai.id AS import_id,
-                sai.strava_activity_id,
-                sai.activity_start,
-                sai.distance_km,
-                sai.moving_time,
-                sai.imported_at,
-                sai.payload_json,
-                s.id AS session_id,
-                s.started_at,
-                s.total_distance_km,
-                s.total_duration_seconds,
-                s.total_calories
-            FROM strava_activity_imports sai
-            JOIN sessions s ON s.id = sai.session_id
-            WHERE sai.user_id=?
-            ORDER BY sai.activity_start DESC, sai.imported_at DESC
-            LIMIT ?
-            """,
-            (user_id, limit),
-        )
-        rows = cur.fetchall()
-        return [dict(r) for r in rows]
+        with self._read_conn() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                """
+                SELECT
+                    sai.id AS import_id,
+                    sai.strava_activity_id,
+                    sai.activity_start,
+                    sai.distance_km,
+                    sai.moving_time,
+                    sai.imported_at,
+                    -- only the cadence is listed; the payload itself stays in SQLite
+                    CASE WHEN json_valid(sai.payload_json)
+                         THEN json_extract(sai.payload_json, '$.average_cadence')
+                    END AS average_cadence,
+                    s.id AS session_id,
+                    s.started_at,
+                    s.total_distance_km,
+                    s.total_duration_seconds,
+                    s.total_calories
+                FROM strava_activity_imports sai
+                JOIN sessions s ON s.id = sai.session_id
+                WHERE sai.user_id=?
+                ORDER BY sai.activity_start DESC, sai.imported_at DESC
+                LIMIT ?
+                """,
+                (user_id, limit),
+            )
+            return [dict(r) for r in cur]
 
-    def create_session_from_import(
-        self,
+    @staticmethod
+    def _imported_session_rows(
         user_id: str,
         started_at_iso: str,
         duration_seconds: int,
         distance_km: float,
         calories_per_hour: float,
-        note: Optional[str] = None,
-        calories_total: Optional[float] = None,
-    ) -> Dict[str, Any]:
-        user_id = _text_id(user_id)
+        note: Optional[str],
+        calories_total: Optional[float],
+    ) -> Tuple[tuple, tuple]:
+        """
+        Build the (sessions row, metrics row) parameter tuples for an imported
+        run. The session row carries its own totals, so the single metric
+        stored alongside it is not added to them again.
+        """
         sid = uuid.uuid4().hex
         try:
             dt = datetime.fromisoformat(started_at_iso.replace("Z", "+00:00"))
         except ValueError:
-            dt = datetime.utcnow()
+            dt = datetime.now(timezone.utc)
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=timezone.utc)
         ended_dt = dt + timedelta(seconds=max(0, duration_seconds))
         ended_iso = ended_dt.isoformat().replace("+00:00", "Z")
 
@@ -1296,42 +1882,118 @@ class Repo:
             if calories_total is not None
             else total_hours * calories_per_hour
         )
-
-        cur = self.conn.cursor()
-        cur.execute(
-            """
-            INSERT INTO sessions(
-                id, user_id, started_at, ended_at,
-                total_distance_km, total_duration_seconds, total_calories,
-                calories_per_hour, note
-            )
-            VALUES(?,?,?,?,?,?,?,?,?)
-            """,
-            (
-                sid,
-                user_id,
-                started_at_iso,
-                ended_iso,
-                distance_km,
-                duration_seconds,
-                total_cal,
-                calories_per_hour,
-                note,
-            ),
+        session_row = (
+            sid,
+            user_id,
+            started_at_iso,
+            ended_iso,
+            distance_km,
+            duration_seconds,
+            total_cal,
+            calories_per_hour,
+            note,
+            int(dt.timestamp()),
         )
-        self.conn.commit()
-
-        # Store a single metric so summaries remain consistent
-        self.add_metric(
-            session_id=sid,
-            distance_km=distance_km,
-            duration_seconds=duration_seconds,
-            start_time=started_at_iso,
-            end_time=ended_iso,
+        metric_row = (
+            uuid.uuid4().hex, sid, distance_km, duration_seconds, started_at_iso, ended_iso
         )
+        return session_row, metric_row
 
-        cur.execute("SELECT * FROM sessions WHERE id=?", (sid,))
-        return dict(cur.fetchone())
+    def create_session_from_import(
+        self,
+        user_id: str,
+        started_at_iso: str,
+        duration_seconds: int,
+        distance_km: float,
+        calories_per_hour: float,
+        note: Optional[str] = None,
+        calories_total: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        session_row, metric_row = self._imported_session_rows(
+            _text_id(user_id),
+            started_at_iso,
+            duration_seconds,
+            distance_km,
+            calories_per_hour,
+            note,
+            calories_total,
+        )
+        with self.conn:
+            if _HAS_RETURNING:
+                row = self.conn.execute(
+                    _INSERT_IMPORTED_SESSION_SQL + " RETURNING *", session_row
+                ).fetchone()
+            else:
+                self.conn.execute(_INSERT_IMPORTED_SESSION_SQL, session_row)
+                row = self.conn.execute(
+                    "SELECT * FROM sessions WHERE id=?", (session_row[0],)
+                ).fetchone()
+            self.conn.execute(_INSERT_IMPORTED_METRIC_SQL, metric_row)
+        return dict(row)
+
+    def record_strava_activity_imports_bulk(
+        self, user_id: str, imports: List[Dict[str, Any]]
+    ) -> int:
+        """
+        Store a batch of Strava runs in one transaction: a session, its metric
+        and the strava_activity_imports link for each. Every item carries
+        activity_id, started_at_iso, duration_seconds, distance_km,
+        calories_per_hour and optionally note, calories_total and payload.
+        The link row is claimed first with ON CONFLICT DO NOTHING, and only
+        claimed activities get a session, so an activity already imported
+        (or imported concurrently by another sync) is skipped atomically.
+        Returns the number of activities stored.
+        """
+        user_id = _text_id(user_id)
+        if not imports:
+            return 0
+        now = _utcnow_iso()
+        session_rows, metric_rows = [], []
+        with self.conn:
+            # The link rows reference sessions written after them; the check
+            # runs at COMMIT instead, and the pragma resets with the transaction
+            self.conn.execute("PRAGMA defer_foreign_keys=ON")
+            for item in imports:
+                session_row, metric_row = self._imported_session_rows(
+                    user_id,
+                    item["started_at_iso"],
+                    item["duration_seconds"],
+                    item["distance_km"],
+                    item["calories_per_hour"],
+                    item.get("note"),
+                    item.get("calories_total"),
+                )
+                payload = item.get("payload")
+                cur = self.conn.execute(
+                    """
+                    INSERT INTO strava_activity_imports(
+                        id, user_id, strava_activity_id, session_id,
+                        activity_start, distance_km, moving_time,
+                        payload_json, imported_at
+                    )
+                    VALUES(?,?,?,?,?,?,?,?,?)
+                    ON CONFLICT(user_id, strava_activity_id) DO NOTHING
+                    """,
+                    (
+                        uuid.uuid4().hex,
+                        user_id,
+                        item["activity_id"],
+                        session_row[0],
+                        item["started_at_iso"],
+                        item["distance_km"],
+                        item["duration_seconds"],
+                        orjson.dumps(payload).decode() if payload is not None else None,
+                        now,
+                    ),
+                )
+                if cur.rowcount == 1:
+                    session_rows.append(session_row)
+                    metric_rows.append(metric_row)
+            self.conn.executemany(_INSERT_IMPORTED_SESSION_SQL, session_rows)
+            self.conn.executemany(_INSERT_IMPORTED_METRIC_SQL, metric_rows)
+            if session_rows:
+                self._bump_version(user_id)
+        return len(session_rows)
 
     def get_strava_activity_detail(
         self, user_id: str, strava_activity_id: int
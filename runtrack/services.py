@@ -1,23 +1,30 @@
 from __future__ import annotations
 
+import bisect
+import copy
+import functools
 import hashlib
 import hmac
 import json
 import logging
 import os
 import re
+import sqlite3
+import threading
 import time
 import uuid
 from datetime import datetime, timezone, timedelta, date
 from typing import Optional, Dict, Any, List
 from zoneinfo import ZoneInfo
 
+import numpy as np
+import orjson
 from openai import OpenAI
 
 from .config_loader import load_json_config
 from .strava_client import StravaAPIError, StravaClient
 
-from .repository import Repo
+from .repository import Repo, _epoch_day_to_date
 
 repo = Repo()
 CENTRAL_TZ = "America/Chicago"
@@ -88,6 +95,42 @@ _strava_client: Optional[StravaClient] = None
 # ---------- Helpers ----------
 
 
+# Per-user data version, bumped whenever a user's sessions/metrics/plans
+# change. Used as the cache key for history/prompt/dashboard and as the basis
+# of their ETags. It lives in the database so every worker process sees the
+# same value and survives restarts; the repo's write methods bump it in the
+# same transaction as the write itself.
+def get_user_version(user_id: str) -> int:
+    return repo.get_user_data_version(_normalize_user_id(user_id))
+
+
+# Short-lived cache for read-heavy aggregates (dashboard, plan calendar).
+# Keys include the user's data version, so writes invalidate immediately; the
+# TTL only bounds staleness of time-dependent fields such as "is_today".
+# Callers get a deep copy, so editing a result cannot leak into the cache.
+READ_CACHE_TTL_SECONDS = 60.0
+_READ_CACHE_MAX_ENTRIES = 1024
+_read_cache: Dict[tuple, tuple] = {}
+_read_cache_lock = threading.Lock()
+
+
+def _ttl_cached(key: tuple, user_id: str, compute: Any) -> Any:
+    full_key = key + (repo.get_user_data_version(user_id),)
+    now = time.monotonic()
+    hit = _read_cache.get(full_key)
+    if hit is not None and hit[0] > now:
+        return copy.deepcopy(hit[1])
+    value = compute()
+    with _read_cache_lock:
+        if len(_read_cache) >= _READ_CACHE_MAX_ENTRIES:
+            for k in [k for k, (exp, _) in _read_cache.items() if exp <= now]:
+                del _read_cache[k]
+            if len(_read_cache) >= _READ_CACHE_MAX_ENTRIES:
+                _read_cache.clear()
+        _read_cache[full_key] = (now + READ_CACHE_TTL_SECONDS, value)
+    return copy.deepcopy(value)
+
+
 def _since_iso_from_days(days: int) -> str:
     dt = datetime.now(timezone.utc) - timedelta(days=days)
     return dt.isoformat()
@@ -142,7 +185,7 @@ def _build_active_session_info(
     elapsed = 0
     if started_at:
         try:
-            dt = datetime.fromisoformat(started_at.replace("Z", "+00:00"))
+            dt = _iso_to_datetime(started_at)
             now = datetime.now(timezone.utc)
             elapsed = int(max(0, (now - dt).total_seconds()))
         except Exception:
@@ -157,6 +200,19 @@ def _build_active_session_info(
     }
 
 
+# How often the API process runs repo.run_maintenance (PRAGMA optimize and a
+# WAL truncate checkpoint)
+DB_MAINTENANCE_INTERVAL_SECONDS = 15 * 60
+
+
+def run_db_maintenance() -> None:
+    """Background maintenance tick; errors are logged, not raised."""
+    try:
+        repo.run_maintenance()
+    except sqlite3.Error as e:
+        logging.warning(f"Database maintenance failed: {e}")
+
+
 def _get_strava_client() -> StravaClient:
     global _strava_client
     if _strava_client is None:
@@ -164,6 +220,14 @@ def _get_strava_client() -> StravaClient:
     return _strava_client
 
 
+def close_strava_client() -> None:
+    """Release the shared Strava client's pooled connections (app shutdown)."""
+    global _strava_client
+    if _strava_client is not None:
+        _strava_client.close()
+        _strava_client = None
+
+
 def _build_state_token(user_id: str) -> str:
     normalized = _normalize_user_id(user_id)
     secret = STRAVA_STATE_SECRET.encode("utf-8")
@@ -186,8 +250,31 @@ def _parse_state_token(state: str) -> str:
     return _normalize_user_id(user_id)
 
 
+@functools.lru_cache(maxsize=4096)
 def _iso_to_datetime(value: str) -> datetime:
-    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    # Active sessions re-parse the same started_at on every poll, so parses are
+    # memoized. Python 3.11+ reads a trailing "Z" directly; older versions
+    # need the "+00:00" rewrite.
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+_ISO_DATE_HOUR_RE = re.compile(r"(\d{4})-(\d{2})-(\d{2})T(\d{2})")
+
+
+def _iso_date_and_hour(value: str) -> tuple[date, int]:
+    """
+    Calendar date and hour of an ISO timestamp as written (no timezone
+    conversion), read straight from the text; unusual inputs fall back to a
+    full parse.
+    """
+    m = _ISO_DATE_HOUR_RE.match(value)
+    if m:
+        return date(int(m[1]), int(m[2]), int(m[3])), int(m[4])
+    dt = _iso_to_datetime(value)
+    return dt.date(), dt.hour
 
 
 def format_seconds_label(total_seconds: int) -> str:
@@ -265,11 +352,12 @@ def start_run(user_id: str, note: Optional[str] = None) -> Dict[str, Any]:
     if not user:
         raise ValueError("user not found")
     settings = repo.get_or_create_user_settings(user_id)
-    return repo.create_active_session(
+    session = repo.create_active_session(
         user_id,
         note,
         calories_per_hour=settings["calories_per_hour"],
     )
+    return session
 
 
 def add_metric(
@@ -283,13 +371,34 @@ def add_metric(
     active = repo.get_active_session(user_id)
     if not active:
         raise ValueError("No active session for this user")
-    return repo.add_metric(
+    metric = repo.add_metric(
         active["id"],
         distance_km,
         duration_seconds,
         start_time,
         end_time,
     )
+    return metric
+
+
+def add_metrics_bulk(
+    user_id: str,
+    distances_km: List[float],
+    durations_seconds: List[int],
+) -> Dict[str, Any]:
+    """
+    Record a batch of metric samples for the user's active session in one call.
+    """
+    user_id = _normalize_user_id(user_id)
+    if len(distances_km) != len(durations_seconds):
+        raise ValueError("distance_km and duration_seconds must have the same length")
+    if not distances_km:
+        raise ValueError("no metrics provided")
+    active = repo.get_active_session(user_id)
+    if not active:
+        raise ValueError("No active session for this user")
+    totals = repo.add_metrics_bulk(active["id"], distances_km, durations_seconds)
+    return totals
 
 
 def stop_run(
@@ -301,11 +410,12 @@ def stop_run(
     active = repo.get_active_session(user_id)
     if not active:
         raise ValueError("No active session for this user")
-    return repo.finish_session(
+    finished = repo.finish_session(
         active["id"],
         total_distance_km=total_distance_km,
         elapsed_seconds=elapsed_seconds,
     )
+    return finished
 
 
 # ---------- pause / resume (frontend-driven timing) ----------
@@ -345,25 +455,70 @@ def resume_run(user_id: str) -> Dict[str, Any]:
     return _build_active_session_info(active, is_paused=False)
 
 
+def _aggregate(distances_km: Any, durations_s: Any) -> tuple:
+    """
+    Vectorised totals over parallel distance/duration arrays.
+    Returns (total_km, total_seconds, best_pace, avg_pace); paces are in
+    seconds per km and None when there is no distance to divide by.
+    """
+    d = np.asarray(distances_km, dtype=np.float64)
+    s = np.asarray(durations_s, dtype=np.int64)
+    total_km = float(d.sum())
+    total_s = int(s.sum())
+    moving = d > 0
+    best_pace = float((s[moving] / d[moving]).min()) if moving.any() else None
+    avg_pace = total_s / total_km if total_km > 0 else None
+    return total_km, total_s, best_pace, avg_pace
+
+
+def _with_overall_stats(data: Dict[str, Any]) -> Dict[str, Any]:
+    sessions = data.get("sessions") or []
+    total_km, total_s, best_pace, avg_pace = _aggregate(
+        [s["total_distance_km"] or 0.0 for s in sessions],
+        [s["total_duration_seconds"] or 0 for s in sessions],
+    )
+    data["overall_stats"] = {
+        "total_distance_km": round(total_km, 3),
+        "total_duration_seconds": total_s,
+        "best_pace_sec_per_km": round(best_pace, 1) if best_pace is not None else None,
+        "avg_pace_sec_per_km": round(avg_pace, 1) if avg_pace is not None else None,
+    }
+    return data
+
+
+@functools.lru_cache(maxsize=256)
+def _cached_history(user_id: str, version: int, limit: int) -> Dict[str, Any]:
+    return _with_overall_stats(repo.fetch_history_by_user_id(user_id, limit))
+
+
+@functools.lru_cache(maxsize=256)
+def _cached_prompt_payload(user_id: str, version: int, last_n: int) -> Dict[str, Any]:
+    return _with_overall_stats(repo.fetch_recent_for_prompt_by_user_id(user_id, last_n))
+
+
+# The cached dicts are shared between requests; callers get their own copy
 def view_history(user_id: str, limit: int = 20) -> Dict[str, Any]:
     user_id = _normalize_user_id(user_id)
-    return repo.fetch_history_by_user_id(user_id, limit)
+    return copy.deepcopy(
+        _cached_history(user_id, repo.get_user_data_version(user_id), limit)
+    )
 
 
 def build_prompt_payload(user_id: str, last_n: int = 5) -> Dict[str, Any]:
     user_id = _normalize_user_id(user_id)
-    return repo.fetch_recent_for_prompt_by_user_id(user_id, last_n)
+    return copy.deepcopy(
+        _cached_prompt_payload(user_id, repo.get_user_data_version(user_id), last_n)
+    )
 
 
 def get_recent_runs(user_id: str, limit: int = 5) -> Dict[str, Any]:
     if limit <= 0:
         raise ValueError("limit must be positive")
     user_id = _normalize_user_id(user_id)
-    data = repo.fetch_history_by_user_id(user_id, limit)
-    if not data.get("user_id"):
+    if not repo.get_user_by_id(user_id):
         raise ValueError("user not found")
     sessions = []
-    for s in data.get("sessions", []):
+    for s in repo.list_sessions_summary(user_id, limit):
         sessions.append(
             {
                 "id": s["id"],
@@ -375,9 +530,9 @@ def get_recent_runs(user_id: str, limit: int = 5) -> Dict[str, Any]:
             }
         )
     return {
-        "user_id": data["user_id"],
+        "user_id": user_id,
         "count": len(sessions),
-        "sessions": sessions[:limit],
+        "sessions": sessions,
     }
 
 
@@ -413,9 +568,7 @@ def build_history_json(user_id: str, limit: int = 50) -> Dict[str, Any]:
             "sessions": [],
         }
 
-    total_dist = 0.0
-    for s in raw["sessions"]:
-        total_dist += float(s["total_distance_km"] or 0.0)
+    total_dist = float(sum(s["total_distance_km"] or 0.0 for s in raw["sessions"]))
     count = raw["count"]
     avg_dist = total_dist / count if count > 0 else 0.0
 
@@ -458,6 +611,38 @@ def build_history_json(user_id: str, limit: int = 50) -> Dict[str, Any]:
     }
 
 
+def _history_summary_json(user_id: str, limit: int) -> Dict[str, Any]:
+    """
+    build_history_json without the sessions: the user and overall_stats,
+    totalled in SQL so no session or metric rows are loaded.
+    """
+    raw = repo.fetch_overall_stats_for_prompt(_normalize_user_id(user_id), limit)
+    if raw is None:
+        return {
+            "user": None,
+            "overall_stats": {
+                "total_distance_km": 0.0,
+                "total_sessions": 0,
+                "avg_distance_per_session": 0.0,
+            },
+        }
+    total_dist = float(raw["total_distance_km"])
+    count = raw["total_sessions"]
+    avg_dist = total_dist / count if count > 0 else 0.0
+    return {
+        "user": {
+            "id": raw["id"],
+            "name": raw["username"],
+            "role": "runner",
+        },
+        "overall_stats": {
+            "total_distance_km": round(total_dist, 3),
+            "total_sessions": count,
+            "avg_distance_per_session": round(avg_dist, 3),
+        },
+    }
+
+
 # ---------- TRAINING PLANS (generic) ----------
 
 
@@ -548,13 +733,14 @@ def create_coach_note_for_runner(
     runner_id: str,
     content: str,
 ) -> Dict[str, Any]:
-    coach = repo.get_user_by_id(coach_id)
+    users = repo.get_users_by_ids([coach_id, runner_id])
+    coach = users.get(coach_id)
     if not coach:
         raise ValueError("coach not found")
     if coach.get("role") != "coach":
         raise ValueError("only coach can create notes")
 
-    runner = repo.get_user_by_id(runner_id)
+    runner = users.get(runner_id)
     if not runner:
         raise ValueError("runner not found")
     if runner.get("role") != "runner":
@@ -587,15 +773,19 @@ def list_notes_for_runner(runner_id: str) -> List[Dict[str, Any]]:
 # ---------- STATS: OVERVIEW, DAILY, TIME-OF-DAY, TRAINING LOAD ----------
 
 
-def get_stats_overview(user_id: str, days: int) -> Dict[str, Any]:
-    since_iso = _since_iso_from_days(days)
-    overview = repo.stats_overview(user_id, since_iso, only_strava=True)
+def _finish_overview(overview: Dict[str, Any], days: int) -> Dict[str, Any]:
     calories = overview["total_distance_km"] * 60.0
     overview["estimated_calories"] = round(calories, 1)
     overview["range_days"] = days
     return overview
 
 
+def get_stats_overview(user_id: str, days: int) -> Dict[str, Any]:
+    since_iso = _since_iso_from_days(days)
+    overview = repo.stats_overview(user_id, since_iso, only_strava=True)
+    return _finish_overview(overview, days)
+
+
 def get_stats_daily(user_id: str, days: int) -> Dict[str, Any]:
     since_iso = _since_iso_from_days(days)
     daily = repo.stats_daily(user_id, since_iso, only_strava=True)
@@ -605,6 +795,45 @@ def get_stats_daily(user_id: str, days: int) -> Dict[str, Any]:
     }
 
 
+def _overview_from_sessions(sessions: List[Dict[str, Any]], days: int) -> Dict[str, Any]:
+    """Same result as get_stats_overview, from stats_sessions_since rows."""
+    return _finish_overview(
+        {
+            "total_sessions": len(sessions),
+            "total_distance_km": sum(s["total_distance_km"] for s in sessions),
+            "total_duration_seconds": sum(s["total_duration_seconds"] for s in sessions),
+        },
+        days,
+    )
+
+
+def _daily_from_sessions(sessions: List[Dict[str, Any]], days: int) -> Dict[str, Any]:
+    """
+    Same result as get_stats_daily, from stats_sessions_since rows (already
+    ordered by started_at_epoch, so each UTC day is one contiguous run).
+    """
+    daily: List[Dict[str, Any]] = []
+    current_day = None
+    for s in sessions:
+        day = s["started_at_epoch"] // 86400
+        if day != current_day:
+            current_day = day
+            bucket = {
+                "date": _epoch_day_to_date(day),
+                "sessions": 0,
+                "distance_km": 0,
+                "duration_seconds": 0,
+            }
+            daily.append(bucket)
+        bucket["sessions"] += 1
+        bucket["distance_km"] += s["total_distance_km"]
+        bucket["duration_seconds"] += s["total_duration_seconds"]
+    return {
+        "range_days": days,
+        "daily": daily,
+    }
+
+
 def _bucket_for_hour(hour: int) -> str:
     if 5 <= hour < 10:
         return "morning"
@@ -617,10 +846,19 @@ def _bucket_for_hour(hour: int) -> str:
     return "night"
 
 
+# Bucket name per hour of day, looked up once per session row
+_HOUR_BUCKET = tuple(_bucket_for_hour(h) for h in range(24))
+
+
 def get_stats_time_of_day(user_id: str, days: int) -> Dict[str, Any]:
     since_iso = _since_iso_from_days(days)
     sessions = repo.stats_sessions_since(user_id, since_iso, only_strava=True)
+    return _time_of_day_from_sessions(sessions, days)
+
 
+def _time_of_day_from_sessions(
+    sessions: List[Dict[str, Any]], days: int
+) -> Dict[str, Any]:
     buckets = {
         "morning": {"sessions": 0, "distance_km": 0.0, "duration_seconds": 0},
         "forenoon": {"sessions": 0, "distance_km": 0.0, "duration_seconds": 0},
@@ -631,9 +869,8 @@ def get_stats_time_of_day(user_id: str, days: int) -> Dict[str, Any]:
 
     total_sessions = 0
     for s in sessions:
-        dt = datetime.fromisoformat(s["started_at"].replace("Z", "+00:00"))
-        hour = dt.hour
-        key = _bucket_for_hour(hour)
+        _, hour = _iso_date_and_hour(s["started_at"])
+        key = _HOUR_BUCKET[hour]
         b = buckets[key]
         b["sessions"] += 1
         b["distance_km"] += s["total_distance_km"]
@@ -664,16 +901,22 @@ def get_stats_training_load(user_id: str, weeks: int) -> Dict[str, Any]:
     days = weeks * 7
     since_iso = _since_iso_from_days(days)
     sessions = repo.stats_sessions_since(user_id, since_iso, only_strava=True)
+    return _training_load_from_sessions(sessions, weeks)
+
 
+def _training_load_from_sessions(
+    sessions: List[Dict[str, Any]], weeks: int
+) -> Dict[str, Any]:
     weekly: Dict[str, float] = {}
     week_start_dates: Dict[str, str] = {}
 
     for s in sessions:
-        dt = datetime.fromisoformat(s["started_at"].replace("Z", "+00:00"))
-        iso_year, iso_week, iso_weekday = dt.isocalendar()
+        day, _ = _iso_date_and_hour(s["started_at"])
+        iso_year, iso_week, iso_weekday = day.isocalendar()
         week_key = f"{iso_year}-W{iso_week:02d}"
-        monday = dt - timedelta(days=iso_weekday - 1)
-        week_start_dates[week_key] = monday.date().isoformat()
+        if week_key not in week_start_dates:
+            monday = day - timedelta(days=iso_weekday - 1)
+            week_start_dates[week_key] = monday.isoformat()
         load = s["total_distance_km"] * 100.0
         weekly[week_key] = weekly.get(week_key, 0.0) + load
 
@@ -704,10 +947,32 @@ def get_stats_training_load(user_id: str, weeks: int) -> Dict[str, Any]:
 
 def get_dashboard(user_id: str, days: int, weeks: int) -> Dict[str, Any]:
     user_id = _normalize_user_id(user_id)
-    overview = get_stats_overview(user_id, days)
-    daily = get_stats_daily(user_id, days)
-    time_of_day = get_stats_time_of_day(user_id, days)
-    training_load = get_stats_training_load(user_id, weeks)
+    return _ttl_cached(
+        ("dashboard", user_id, days, weeks),
+        user_id,
+        lambda: _build_dashboard(user_id, days, weeks),
+    )
+
+
+def _build_dashboard(user_id: str, days: int, weeks: int) -> Dict[str, Any]:
+    # One read over the longer of the two windows; each view then takes the
+    # suffix of the epoch-ordered rows that falls inside its own window
+    now = datetime.now(timezone.utc)
+    days_since = int((now - timedelta(days=days)).timestamp())
+    weeks_since = int((now - timedelta(days=weeks * 7)).timestamp())
+    sessions = repo.stats_sessions_since(
+        user_id,
+        datetime.fromtimestamp(min(days_since, weeks_since), timezone.utc).isoformat(),
+        only_strava=True,
+    )
+    epochs = [s["started_at_epoch"] for s in sessions]
+    in_days = sessions[bisect.bisect_left(epochs, days_since):]
+    in_weeks = sessions[bisect.bisect_left(epochs, weeks_since):]
+
+    overview = _overview_from_sessions(in_days, days)
+    daily = _daily_from_sessions(in_days, days)
+    time_of_day = _time_of_day_from_sessions(in_days, days)
+    training_load = _training_load_from_sessions(in_weeks, weeks)
 
     return {
         "overview": overview,
@@ -720,6 +985,19 @@ def get_dashboard(user_id: str, days: int, weeks: int) -> Dict[str, Any]:
 # ---------- RUN RECORD APIS ----------
 
 
+def _session_totals(sessions: List[Dict[str, Any]]) -> tuple[int, float, float]:
+    """
+    (duration_seconds, distance_km, calories) summed over session rows in a
+    single pass; missing values count as zero.
+    """
+    total_duration, total_distance, total_calories = 0, 0.0, 0.0
+    for s in sessions:
+        total_duration += s["total_duration_seconds"] or 0
+        total_distance += s["total_distance_km"] or 0.0
+        total_calories += s["total_calories"] or 0.0
+    return total_duration, total_distance, total_calories
+
+
 def get_today_run_record(user_id: str, tz_name: str = CENTRAL_TZ) -> Dict[str, Any]:
     user_id = _normalize_user_id(user_id)
     user = repo.get_user_by_id(user_id)
@@ -752,9 +1030,7 @@ def get_today_run_record(user_id: str, tz_name: str = CENTRAL_TZ) -> Dict[str, A
         user_id, start_utc, end_utc, only_strava=True
     )
 
-    total_duration = sum((s.get("total_duration_seconds") or 0) for s in sessions)
-    total_calories = sum((s.get("total_calories") or 0.0) for s in sessions)
-    total_distance = sum((s.get("total_distance_km") or 0.0) for s in sessions)
+    total_duration, total_distance, total_calories = _session_totals(sessions)
 
     active_info = None
 
@@ -793,9 +1069,7 @@ def get_run_record_list(
         user_id, start_utc, end_utc, only_strava=True
     )
 
-    total_duration = sum(s["total_duration_seconds"] for s in sessions)
-    total_distance = sum(s["total_distance_km"] for s in sessions)
-    total_calories = sum(s["total_calories"] for s in sessions)
+    total_duration, total_distance, total_calories = _session_totals(sessions)
 
     return {
         "timezone": tz_name,
@@ -878,6 +1152,20 @@ def set_week_plan_rule(
 # ---------- DAILY RUNNING PLAN + CALENDAR ----------
 
 
+def _validate_plan_slot(start_time: str, duration_minutes: int, distance_km: float) -> None:
+    try:
+        hh, mm = map(int, start_time.split(":"))
+        if not (0 <= hh <= 23 and 0 <= mm <= 59):
+            raise ValueError
+    except Exception:
+        raise ValueError("start_time must be HH:MM")
+
+    if duration_minutes <= 0:
+        raise ValueError("duration_minutes must be positive")
+    if distance_km < 0:
+        raise ValueError("distance_km must be >= 0")
+
+
 def create_day_plan(
     user_id: str,
     date_str: str,
@@ -892,24 +1180,12 @@ def create_day_plan(
         raise ValueError("user not found")
 
     try:
-        d = date.fromisoformat(date_str)
+        _ = date.fromisoformat(date_str)
     except Exception:
         raise ValueError("date must be YYYY-MM-DD")
+    _validate_plan_slot(start_time, duration_minutes, distance_km)
 
-    try:
-        hh, mm = map(int, start_time.split(":"))
-        if not (0 <= hh <= 23 and 0 <= mm <= 59):
-            raise ValueError
-    except Exception:
-        raise ValueError("start_time must be HH:MM")
-
-    if duration_minutes <= 0:
-        raise ValueError("duration_minutes must be positive")
-    if distance_km < 0:
-        raise ValueError("distance_km must be >= 0")
-
-    _ = d
-    return repo.create_daily_plan(
+    plan = repo.create_daily_plan(
         user_id,
         date_str,
         start_time,
@@ -918,6 +1194,7 @@ def create_day_plan(
         activity or None,
         description or None,
     )
+    return plan
 
 
 def delete_day_plan(user_id: str, plan_id: str) -> None:
@@ -955,38 +1232,30 @@ def create_weekly_batch_plans(
     if weekday < 0 or weekday > 6:
         raise ValueError("weekday must be in [0, 6]")
 
-    tmp = create_day_plan(
-        user_id=user_id,
-        date_str=f"{year:04d}-{month:02d}-01",
-        start_time=start_time,
-        duration_minutes=duration_minutes,
-        distance_km=distance_km,
-        activity=activity,
-    )
-    repo.delete_daily_plan(user_id, tmp["id"])
+    try:
+        first_day = date(year, month, 1)
+    except Exception:
+        raise ValueError("date must be YYYY-MM-DD")
+    _validate_plan_slot(start_time, duration_minutes, distance_km)
 
-    first_day = date(year, month, 1)
     if month == 12:
         next_month = date(year + 1, 1, 1)
     else:
         next_month = date(year, month + 1, 1)
 
-    d = first_day
-    created: List[Dict[str, Any]] = []
-    while d < next_month:
-        if d.weekday() == weekday:
-            created.append(
-                repo.create_daily_plan(
-                    user_id,
-                    d.isoformat(),
-                    start_time,
-                    duration_minutes,
-                    distance_km,
-                    activity or None,
-                    None,
-                )
-            )
-        d += timedelta(days=1)
+    # Jump straight to the first matching weekday, then step a week at a time
+    offset = (weekday - first_day.weekday()) % 7
+    created = repo.create_daily_plans_bulk(
+        user_id,
+        [
+            date.fromordinal(ordinal).isoformat()
+            for ordinal in range(first_day.toordinal() + offset, next_month.toordinal(), 7)
+        ],
+        start_time,
+        duration_minutes,
+        distance_km,
+        activity or None,
+    )
 
     return {"created": created, "count": len(created)}
 
@@ -996,6 +1265,19 @@ def get_running_plan_calendar(
     year: int,
     month: int,
     tz_name: str = CENTRAL_TZ,
+) -> Dict[str, Any]:
+    return _ttl_cached(
+        ("calendar", user_id, year, month, tz_name),
+        _normalize_user_id(user_id),
+        lambda: _build_running_plan_calendar(user_id, year, month, tz_name),
+    )
+
+
+def _build_running_plan_calendar(
+    user_id: str,
+    year: int,
+    month: int,
+    tz_name: str,
 ) -> Dict[str, Any]:
     user = repo.get_user_by_id(user_id)
     if not user:
@@ -1029,8 +1311,8 @@ def get_running_plan_calendar(
         )
 
     days: List[Dict[str, Any]] = []
-    d = first_day
-    while d < next_month:
+    for ordinal in range(first_day.toordinal(), next_month.toordinal()):
+        d = date.fromordinal(ordinal)
         date_str = d.isoformat()
         day_plans = plans_by_date.get(date_str, [])
         days.append(
@@ -1041,7 +1323,6 @@ def get_running_plan_calendar(
                 "plans": day_plans,
             }
         )
-        d += timedelta(days=1)
 
     return {
         "timezone": tz_name,
@@ -1060,7 +1341,7 @@ def ai_analyze_history_and_plan(
     weeks_to_plan: int,
     extra_notes: Optional[str] = None,
 ) -> Dict[str, Any]:
-    history = build_history_json(user_id, limit)
+    history = _history_summary_json(user_id, limit)
     if history["user"] is None:
         raise ValueError("user not found or no history")
 
@@ -1770,6 +2051,8 @@ def strava_sync_runner(
         if not activities:
             break
 
+        # The page's new runs are written together in one transaction
+        page_imports: Dict[int, Dict[str, Any]] = {}
         for activity in activities:
             act_id = activity.get("id")
             if act_id is None:
@@ -1805,39 +2088,30 @@ def strava_sync_runner(
 
             start_ts = int(start_dt.timestamp())
 
-            if repo.has_imported_strava_activity(user_id, int(act_id)):
+            if start_ts > latest_cursor:
+                latest_cursor = start_ts
+                latest_activity_iso = start_dt.isoformat()
+            if int(act_id) in page_imports:
                 skipped += 1
-                if start_ts > latest_cursor:
-                    latest_cursor = start_ts
-                    latest_activity_iso = start_dt.isoformat()
                 continue
 
-            note = f"Imported from Strava #{act_id}"
-            calories_total = activity.get("calories")
-            session = repo.create_session_from_import(
-                user_id=user_id,
-                started_at_iso=start_iso,
-                duration_seconds=duration,
-                distance_km=distance_km,
-                calories_per_hour=calories_per_hour,
-                note=note,
-                calories_total=calories_total,
-            )
-
-            repo.record_strava_activity_import(
-                user_id=user_id,
-                activity_id=int(act_id),
-                session_id=session["id"],
-                activity_start=start_iso,
-                distance_km=distance_km,
-                moving_time=duration,
-                payload=activity,
-            )
+            page_imports[int(act_id)] = {
+                "activity_id": int(act_id),
+                "started_at_iso": start_iso,
+                "duration_seconds": duration,
+                "distance_km": distance_km,
+                "calories_per_hour": calories_per_hour,
+                "note": f"Imported from Strava #{act_id}",
+                "calories_total": activity.get("calories"),
+                "payload": activity,
+            }
 
-            imported += 1
-            if start_ts > latest_cursor:
-                latest_cursor = start_ts
-                latest_activity_iso = start_dt.isoformat()
+        # Activities imported by an earlier sync are dropped by the repo
+        stored = repo.record_strava_activity_imports_bulk(
+            user_id, list(page_imports.values())
+        )
+        imported += stored
+        skipped += len(page_imports) - stored
 
         if len(activities) < 50:
             break
@@ -1861,6 +2135,35 @@ def strava_sync_runner(
     }
 
 
+# A sync claim older than this is assumed to belong to a worker that died
+_STRAVA_SYNC_STALE_SECONDS = 60 * 60
+
+
+def queue_strava_sync(user_id: str) -> bool:
+    """
+    Validate that a sync can run and mark it in progress.
+    Returns False if a sync for this user is already queued or running.
+    """
+    user_id = _normalize_user_id(user_id)
+    _ensure_runner_user(user_id)
+    if not repo.get_strava_credentials(user_id):
+        raise ValueError("Strava account is not linked for this user")
+    return repo.claim_strava_sync(user_id, _STRAVA_SYNC_STALE_SECONDS)
+
+
+def run_queued_strava_sync(user_id: str) -> None:
+    """
+    Background-task body for queue_strava_sync; errors are logged, not raised.
+    """
+    user_id = _normalize_user_id(user_id)
+    try:
+        strava_sync_runner(user_id)
+    except ValueError as e:
+        logging.warning(f"Strava sync failed for user {user_id}: {e}")
+    finally:
+        repo.release_strava_sync(user_id)
+
+
 def get_strava_status(user_id: str) -> Dict[str, Any]:
     user_id = _normalize_user_id(user_id)
     _ensure_runner_user(user_id)
@@ -1872,6 +2175,9 @@ def get_strava_status(user_id: str) -> Dict[str, Any]:
     expires_at = int(creds.get("expires_at") or 0)
     return {
         "linked": True,
+        "sync_in_progress": repo.is_strava_sync_in_progress(
+            user_id, _STRAVA_SYNC_STALE_SECONDS
+        ),
         "athlete_id": creds.get("athlete_id"),
         "scope": creds.get("scope"),
         "last_sync": creds.get("last_sync"),
@@ -1903,16 +2209,6 @@ def get_recent_strava_runs(
     rows = repo.fetch_recent_strava_runs(user_id, limit)
     runs: List[Dict[str, Any]] = []
     for row in rows:
-        # Extract cadence from payload_json if available
-        cadence = None
-        payload_raw = row.get("payload_json")
-        if payload_raw:
-            try:
-                payload_data = json.loads(payload_raw)
-                cadence = payload_data.get("average_cadence")
-            except Exception:
-                pass
-        
         runs.append(
             {
                 "id": row["import_id"],
@@ -1923,14 +2219,16 @@ def get_recent_strava_runs(
                 "duration_seconds": row["total_duration_seconds"]
                 or row["moving_time"],
                 "calories": row.get("total_calories"),
-                "cadence": cadence,
+                "cadence": row["average_cadence"],
                 "recorded_at": row["activity_start"],
             }
         )
     return runs
 
 
-def get_strava_run_detail(user_id: str, strava_activity_id: int) -> Dict[str, Any]:
+def _load_strava_run(
+    user_id: str, strava_activity_id: int
+) -> tuple[Dict[str, Any], Dict[str, Any]]:
     user_id = _normalize_user_id(user_id)
     _ensure_runner_user(user_id)
     detail = repo.get_strava_activity_detail(user_id, strava_activity_id)
@@ -1940,18 +2238,13 @@ def get_strava_run_detail(user_id: str, strava_activity_id: int) -> Dict[str, An
     payload_raw = detail.get("payload_json")
     if payload_raw:
         try:
-            payload_data = json.loads(payload_raw)
+            payload_data = orjson.loads(payload_raw)
         except Exception:
             payload_data = {}
-    distance_km = float(
-        detail.get("total_distance_km") or detail.get("distance_km") or 0.0
-    )
-    duration_seconds = int(
-        detail.get("total_duration_seconds") or detail.get("moving_time") or 0
-    )
-    calories = detail.get("total_calories")
-    if calories is None:
-        calories = payload_data.get("calories")
+    return detail, payload_data
+
+
+def _format_strava_splits(payload_data: Dict[str, Any]) -> List[Dict[str, Any]]:
     splits = payload_data.get("splits_metric") or payload_data.get("splits_standard") or []
     formatted_splits: List[Dict[str, Any]] = []
     for idx, split in enumerate(splits[:20], start=1):
@@ -1973,31 +2266,28 @@ def get_strava_run_detail(user_id: str, strava_activity_id: int) -> Dict[str, An
                 "cadence": cadence,
             }
         )
+    return formatted_splits
+
+
+def get_strava_run_detail(user_id: str, strava_activity_id: int) -> Dict[str, Any]:
+    """
+    Run metadata and splits. The pace/cadence time series is served separately
+    by get_strava_pace_series so it can be streamed.
+    """
+    detail, payload_data = _load_strava_run(user_id, strava_activity_id)
+    distance_km = float(
+        detail.get("total_distance_km") or detail.get("distance_km") or 0.0
+    )
+    duration_seconds = int(
+        detail.get("total_duration_seconds") or detail.get("moving_time") or 0
+    )
+    calories = detail.get("total_calories")
+    if calories is None:
+        calories = payload_data.get("calories")
+    formatted_splits = _format_strava_splits(payload_data)
     average_speed = payload_data.get("average_speed")
     if average_speed and average_speed > 0:
         average_speed = average_speed * 3.6  # m/s -> km/h
-    # Build cadence/pace time series (approximate chunks of 30s)
-    pace_series: List[Dict[str, Any]] = []
-    cumulative = 0
-    chunk = 30
-    for split in formatted_splits:
-        remaining = split["duration_seconds"]
-        cadence_val = split.get("cadence")
-        pace_val = split.get("pace_seconds")
-        if remaining <= 0:
-            continue
-        while remaining > 0:
-            use = min(chunk, remaining)
-            cumulative += use
-            pace_series.append(
-                {
-                    "time_seconds": cumulative,
-                    "time_label": format_seconds_label(cumulative),
-                    "pace_seconds": pace_val,
-                    "cadence": cadence_val,
-                }
-            )
-            remaining -= use
 
     return {
         "strava_activity_id": detail["strava_activity_id"],
@@ -2016,5 +2306,31 @@ def get_strava_run_detail(user_id: str, strava_activity_id: int) -> Dict[str, An
         "average_watts": payload_data.get("weighted_average_watts")
         or payload_data.get("average_watts"),
         "splits": formatted_splits,
-        "pace_cadence_series": pace_series,
     }
+
+
+def _iter_pace_series(formatted_splits: List[Dict[str, Any]], chunk: int = 30):
+    cumulative = 0
+    for split in formatted_splits:
+        remaining = split["duration_seconds"]
+        cadence_val = split.get("cadence")
+        pace_val = split.get("pace_seconds")
+        while remaining > 0:
+            use = min(chunk, remaining)
+            cumulative += use
+            yield {
+                "time_seconds": cumulative,
+                "time_label": format_seconds_label(cumulative),
+                "pace_seconds": pace_val,
+                "cadence": cadence_val,
+            }
+            remaining -= use
+
+
+def get_strava_pace_series(user_id: str, strava_activity_id: int):
+    """
+    Cadence/pace time series (approximate chunks of 30s) as a lazy iterator.
+    Lookup errors are raised here, before the caller starts streaming.
+    """
+    _, payload_data = _load_strava_run(user_id, strava_activity_id)
+    return _iter_pace_series(_format_strava_splits(payload_data))
@@ -5,6 +5,7 @@ from typing import Any, Dict, List, Optional
 from urllib.parse import urlencode
 
 import requests
+from requests.adapters import HTTPAdapter
 
 from .config_loader import load_json_config
 
@@ -13,6 +14,9 @@ STRAVA_OAUTH_AUTHORIZE = "https://www.strava.com/oauth/authorize"
 STRAVA_OAUTH_TOKEN = "https://www.strava.com/oauth/token"
 STRAVA_API_BASE = "https://www.strava.com/api/v3"
 
+# Keep-alive connections held per host by a client's session
+STRAVA_POOL_SIZE = 20
+
 
 class StravaAPIError(RuntimeError):
     """
@@ -53,6 +57,16 @@ class StravaClient:
             or os.getenv("STRAVA_REDIRECT_URI")
             or _clean(config.get("redirect_uri"))
         )
+        # One pooled session per client so repeated calls reuse the TLS
+        # connection to strava.com instead of handshaking every time
+        self._http = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=2, pool_maxsize=STRAVA_POOL_SIZE
+        )
+        self._http.mount("https://", adapter)
+
+    def close(self) -> None:
+        self._http.close()
 
     # ---------- configuration helpers ----------
 
@@ -106,7 +120,7 @@ class StravaClient:
         return self._request_token(payload)
 
     def _request_token(self, data: Dict[str, Any]) -> Dict[str, Any]:
-        resp = requests.post(STRAVA_OAUTH_TOKEN, data=data, timeout=30)
+        resp = self._http.post(STRAVA_OAUTH_TOKEN, data=data, timeout=30)
         if resp.status_code != 200:
             raise StravaAPIError(
                 f"Strava token request failed: {resp.status_code} {resp.text}"
@@ -130,7 +144,7 @@ class StravaClient:
             params["after"] = after
 
         headers = {"Authorization": f"Bearer {access_token}"}
-        resp = requests.get(
+        resp = self._http.get(
             f"{STRAVA_API_BASE}/athlete/activities",
             headers=headers,
             params=params,
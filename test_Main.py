@@ -2,6 +2,7 @@
 from Main import Runner,  RunnerSessionFactory, runnerSession, RunMetric
 
 #Used unittest to have a premade testing framework
+import json
 import unittest
 from unittest.mock import patch
 from datetime import datetime, timedelta
@@ -53,6 +54,31 @@ class TestRunnerSession(unittest.TestCase):
         mock_print.assert_called_once()
         self.assertIn("Runner session S1 started at", mock_print.call_args[0][0])
 
+    @patch("builtins.print")
+    def test_begin_and_finish_use_supplied_clock(self, mock_print):
+        session = runnerSession("S9")
+        started = datetime(2025, 1, 1, 7, 0, 0)
+        ended = datetime(2025, 1, 1, 7, 30, 0)
+        session.begin(now=started)
+        summary = session.finish(now=ended)
+
+        self.assertEqual(summary["started_at"], started)
+        self.assertEqual(summary["ended_at"], ended)
+        #No metrics were recorded, so the duration comes from the supplied clock
+        self.assertEqual(summary["total_duration"], timedelta(minutes=30))
+
+    @patch("builtins.print")
+    def test_summary_as_dict_is_json_ready(self, mock_print):
+        session = runnerSession("S12")
+        session.begin(now=datetime(2025, 1, 1, 7, 0, 0))
+        session.record_metric(RunMetric(distance=2.0, duration=90.5))
+        summary = session.finish(now=datetime(2025, 1, 1, 7, 2, 0))
+
+        data = summary.as_dict()
+        self.assertEqual(data["total_duration"], 90.5)
+        self.assertEqual(data["started_at"], "2025-01-01T07:00:00")
+        self.assertEqual(json.loads(json.dumps(data)), data)
+
 #Test 5: Test that you can't start two sessions at once
     def test_begin_twice_raises_error(self):
         session = runnerSession("S2")
@@ -79,6 +105,56 @@ class TestRunnerSession(unittest.TestCase):
             self.assertEqual(len(session.metrics), 1)
 
 
+    def test_metrics_keep_start_and_end_times(self):
+            session = runnerSession("S11")
+            start = datetime(2025, 1, 1, 7, 0, 0)
+            end = datetime(2025, 1, 1, 7, 5, 0)
+            session.record_metric(RunMetric(distance=1.0, start_time=start, end_time=end))
+
+            metric = session.metrics[0]
+            self.assertEqual((metric.start_time, metric.end_time), (start, end))
+            self.assertEqual(metric.duration, timedelta(minutes=5))
+
+    def test_metrics_view_reflects_appends(self):
+            session = runnerSession("S13")
+            session.record_metric(RunMetric(distance=1.0, duration=60))
+            session.metrics.append(RunMetric(distance=2.0, duration=120))
+
+            self.assertEqual(len(session.metrics), 2)
+            self.assertEqual([m.distance for m in session.metrics], [1.0, 2.0])
+            self.assertEqual(session.metrics[-1].duration, timedelta(seconds=120))
+            #append only stores the sample; the totals come from record_metric
+            self.assertEqual(session.totalDistance, 1.0)
+
+    def test_record_metric_checked_rejects_non_metrics(self):
+            session = runnerSession("S8")
+            with self.assertRaises(TypeError):
+                session.record_metric_checked((2.5, 300))
+            with self.assertRaises(TypeError):
+                session.record_metric((2.5, 300))
+
+    def test_record_metrics_bulk(self):
+            session = runnerSession("S4")
+            total_distance, total_duration = session.record_metrics_bulk([1.0, 2.0, 0.5], [60, 120, 30])
+
+            #Totals are summed across the whole batch
+            self.assertEqual(total_distance, 3.5)
+            self.assertEqual(total_duration, timedelta(seconds=210))
+
+            #No per-sample objects are kept unless asked for
+            self.assertEqual(len(session.metrics), 0)
+
+            session.record_metrics_bulk([1.0], [60], keep_objects=True)
+            self.assertEqual(len(session.metrics), 1)
+
+    def test_record_metrics_bulk_keeps_fractional_seconds(self):
+            session = runnerSession("S10")
+            _, total_duration = session.record_metrics_bulk([1.0, 1.0], [1.5, 0.25], keep_objects=True)
+
+            #Same microsecond precision as recording the samples one at a time
+            self.assertEqual(total_duration, timedelta(seconds=1.75))
+            self.assertEqual(session.metrics[0].duration, timedelta(seconds=1.5))
+
     @patch("builtins.print")
     def test_finish(self, mock_print):
         session = runnerSession("S5")
@@ -100,6 +176,21 @@ class TestRunnerSession(unittest.TestCase):
         #Test 11: Assert total duration is recorded correctly
         self.assertEqual(summary["total_duration"], timedelta(seconds=60))
 
+        #The summary is a frozen dataclass, so it also supports attribute access
+        self.assertEqual(summary.session_id, "S5")
+        with self.assertRaises(AttributeError):
+            summary.total_distance = 2.0
+
+
+    @patch("builtins.print")
+    def test_finish_without_metrics_uses_elapsed_time(self, mock_print):
+        session = runnerSession("S7")
+        session.begin()
+        summary = session.finish()
+
+        #With no recorded metrics the duration falls back to the time the session ran
+        self.assertGreater(summary["total_duration"], timedelta())
+        self.assertEqual(summary["total_distance"], 0.0)
     
     def test_reset(self):
         #Create data to clear
@@ -110,6 +201,7 @@ class TestRunnerSession(unittest.TestCase):
         session.metrics.append(RunMetric(1.0,100))
         #Actually reset/clear the session
         session.reset()
+        self.assertEqual(len(session.metrics), 0)
 
         #Now test that all these categories are empty
         self.assertIsNone(session.startTime)
@@ -1,4 +1,6 @@
+import logging
 import os
+import sqlite3
 
 os.environ.setdefault("OPENAI_API_KEY", "test-key")
 
@@ -87,6 +89,81 @@ def test_start_and_stop_run(runner_user):
     assert finished["total_duration_seconds"] == 1800
     assert services.repo.get_active_session(user["id"]) is None
 
+def test_add_metrics_bulk_updates_session_totals(runner_user):
+    user, _ = runner_user
+    services.start_run(user["id"])
+
+    totals = services.add_metrics_bulk(
+        user["id"],
+        distances_km=[1.0, 1.5, 2.5],
+        durations_seconds=[300, 450, 750],
+    )
+
+    assert totals["inserted"] == 3
+    assert totals["total_distance_km"] == 5.0
+    assert totals["total_duration_seconds"] == 1500
+
+    with pytest.raises(ValueError):
+        services.add_metrics_bulk(user["id"], [1.0], [60, 60])
+
+
+def test_history_is_refreshed_after_run_changes(runner_user):
+    user, _ = runner_user
+    version = services.get_user_version(user["id"])
+    assert services.view_history(user["id"])["sessions"] == []
+
+    services.start_run(user["id"])
+    services.add_metric(user_id=user["id"], distance_km=2.0, duration_seconds=600)
+
+    assert services.get_user_version(user["id"]) > version
+    history = services.view_history(user["id"])
+    assert len(history["sessions"]) == 1
+    assert history["sessions"][0]["total_distance_km"] == 2.0
+    assert history["overall_stats"]["avg_pace_sec_per_km"] == 300.0
+
+
+def test_cached_reads_hand_out_copies(runner_user):
+    user, _ = runner_user
+    services.start_run(user["id"])
+    services.add_metric(user_id=user["id"], distance_km=2.0, duration_seconds=600)
+
+    history = services.view_history(user["id"])
+    history["sessions"].clear()
+    history["overall_stats"]["total_distance_km"] = 0
+    assert len(services.view_history(user["id"])["sessions"]) == 1
+    assert services.view_history(user["id"])["overall_stats"]["total_distance_km"] == 2.0
+
+    dashboard = services.get_dashboard(user["id"], 7, 4)
+    dashboard.clear()
+    assert services.get_dashboard(user["id"], 7, 4)
+
+
+def test_metric_tick_bumps_the_version_in_the_same_commit(runner_user):
+    user, _ = runner_user
+    services.start_run(user["id"])
+    version = services.get_user_version(user["id"])
+
+    statements = []
+    services.repo.conn.set_trace_callback(statements.append)
+    try:
+        services.add_metric(user_id=user["id"], distance_km=1.0, duration_seconds=300)
+    finally:
+        services.repo.conn.set_trace_callback(None)
+
+    assert services.get_user_version(user["id"]) == version + 1
+    assert [s for s in statements if s.strip().upper() == "COMMIT"] == ["COMMIT"]
+
+
+def test_user_version_is_shared_through_the_database(tmp_path):
+    db_path = str(tmp_path / "shared.db")
+    worker_a, worker_b = Repo(db_path=db_path), Repo(db_path=db_path)
+
+    assert worker_b.get_user_data_version("abc123") == 0
+    worker_a.bump_user_data_version("abc123")
+    worker_a.bump_user_data_version("abc123")
+    assert worker_b.get_user_data_version("abc123") == 2
+
+
 def test_create_and_list_day_plan(runner_user):
     user, _ = runner_user
     date_str = "2025-01-10"
@@ -141,3 +218,499 @@ def test_get_today_run_record_no_sessions(runner_user):
     assert today_summary["total_duration_seconds"] == 0
     assert today_summary["total_calories"] == 0
     assert record["today_goal_seconds"] == 60 * 60
+
+
+def test_create_coach_note_for_runner(coach_user, runner_user):
+    coach, _ = coach_user
+    runner, _ = runner_user
+
+    note = services.create_coach_note_for_runner(coach["id"], runner["id"], "  tempo on Friday ")
+    assert note["coach_name"] == coach["username"]
+    assert note["content"] == "tempo on Friday"
+
+    with pytest.raises(ValueError):
+        services.create_coach_note_for_runner(runner["id"], coach["id"], "swapped roles")
+
+
+def test_running_plan_calendar_reflects_new_day_plan(runner_user):
+    user, _ = runner_user
+    before = services.get_running_plan_calendar(user["id"], 2025, 1)
+    assert all(not day["plans"] for day in before["days"])
+
+    services.create_day_plan(
+        user_id=user["id"],
+        date_str="2025-01-10",
+        start_time="07:30",
+        duration_minutes=40,
+        distance_km=6.0,
+    )
+
+    after = services.get_running_plan_calendar(user["id"], 2025, 1)
+    day = next(d for d in after["days"] if d["date"] == "2025-01-10")
+    assert len(day["plans"]) == 1
+
+
+def _import_strava_run(user_id, activity_id=101, payload=None):
+    session = services.repo.create_session_from_import(
+        user_id=user_id,
+        started_at_iso="2025-01-05T07:00:00Z",
+        duration_seconds=600,
+        distance_km=2.0,
+        calories_per_hour=600.0,
+        note=f"Imported from Strava #{activity_id}",
+    )
+    services.repo.record_strava_activity_import(
+        user_id=user_id,
+        activity_id=activity_id,
+        session_id=session["id"],
+        activity_start="2025-01-05T07:00:00Z",
+        distance_km=2.0,
+        moving_time=600,
+        payload=payload,
+    )
+    return session
+
+
+def test_imported_session_totals_are_not_double_counted(runner_user):
+    user, _ = runner_user
+    session = _import_strava_run(user["id"])
+    assert session["total_distance_km"] == 2.0
+    assert session["total_duration_seconds"] == 600
+
+    history = services.view_history(user["id"])
+    assert len(history["sessions"][0]["metrics"]) == 1
+
+
+def test_strava_pace_series_is_served_separately_from_detail(runner_user):
+    user, _ = runner_user
+    _import_strava_run(
+        user["id"],
+        payload={
+            "average_cadence": 170.0,
+            "splits_metric": [
+                {"distance": 1000, "moving_time": 290},
+                {"distance": 1000, "moving_time": 310},
+            ],
+        },
+    )
+
+    detail = services.get_strava_run_detail(user["id"], 101)
+    assert "pace_cadence_series" not in detail
+    assert [s["pace_seconds"] for s in detail["splits"]] == [290, 310]
+
+    series = list(services.get_strava_pace_series(user["id"], 101))
+    assert series[-1]["time_seconds"] == 600
+    assert all(p["cadence"] == 170.0 for p in series)
+
+    with pytest.raises(ValueError):
+        services.get_strava_pace_series(user["id"], 999)
+
+
+def test_queue_strava_sync_rejects_duplicates_until_finished(runner_user, monkeypatch):
+    user, _ = runner_user
+    with pytest.raises(ValueError):
+        services.queue_strava_sync(user["id"])
+
+    services.repo.upsert_strava_credentials(
+        user["id"], 42, "access", "refresh", 2**31, "activity:read"
+    )
+    calls = []
+    monkeypatch.setattr(services, "strava_sync_runner", calls.append)
+
+    assert services.queue_strava_sync(user["id"]) is True
+    assert services.queue_strava_sync(user["id"]) is False
+    assert services.get_strava_status(user["id"])["sync_in_progress"] is True
+
+    services.run_queued_strava_sync(user["id"])
+    assert calls == [user["id"]]
+    assert services.get_strava_status(user["id"])["sync_in_progress"] is False
+
+
+def test_strava_sync_claim_is_shared_between_connections(tmp_path):
+    first = Repo(db_path=str(tmp_path / "sync.db"))
+    second = Repo(db_path=str(tmp_path / "sync.db"))
+    user = first.create_user("syncer", "runner", "hash")
+
+    assert first.claim_strava_sync(user["id"], 3600) is True
+    assert second.claim_strava_sync(user["id"], 3600) is False
+    assert second.is_strava_sync_in_progress(user["id"], 3600) is True
+
+    # A claim older than the stale limit is not reported, and is taken over
+    assert second.is_strava_sync_in_progress(user["id"], -1) is False
+    assert second.claim_strava_sync(user["id"], -1) is True
+
+    second.release_strava_sync(user["id"])
+    assert first.is_strava_sync_in_progress(user["id"], 3600) is False
+    assert first.claim_strava_sync(user["id"], 3600) is True
+
+
+def test_create_plan_stores_all_entries(runner_user):
+    user, _ = runner_user
+    entries = [
+        {"day_index": i, "focus": "easy", "target_distance_km": 5.0}
+        for i in range(84)
+    ]
+    plan = services.create_plan(
+        user_id=user["id"],
+        name="12 weeks",
+        goal_type="10k",
+        target_event_date=None,
+        meta_json={"weeks": 12},
+        entries=entries,
+    )
+    assert len(plan["entries"]) == 84
+    assert [e["day_index"] for e in plan["entries"]] == list(range(84))
+    assert plan["meta_json"] == {"weeks": 12}
+
+
+def test_started_at_epoch_is_backfilled_and_used_for_stats(tmp_path, caplog):
+    db_path = str(tmp_path / "legacy.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        """
+        CREATE TABLE sessions (
+            id TEXT PRIMARY KEY, user_id TEXT NOT NULL, started_at TEXT NOT NULL,
+            ended_at TEXT, total_distance_km REAL NOT NULL DEFAULT 0,
+            total_duration_seconds INTEGER NOT NULL DEFAULT 0,
+            total_calories REAL NOT NULL DEFAULT 0,
+            calories_per_hour REAL NOT NULL, note TEXT
+        )
+        """
+    )
+    conn.executemany(
+        "INSERT INTO sessions VALUES (?, 'u1', ?, NULL, 5.0, 1800, 0, 600, NULL)",
+        [("s1", "2025-01-05T07:00:00Z"), ("s2", "2025-01-05T19:00:00Z"),
+         ("s3", "2025-01-07 06:30:00 "), ("s4", "not a date")],
+    )
+    conn.commit()
+    conn.close()
+
+    with caplog.at_level(logging.WARNING):
+        repo = Repo(db_path=db_path)
+    # s3 is read by SQLite's parser; s4 cannot be read and is reported
+    assert "session s4" in caplog.text
+    assert "session s3" not in caplog.text
+    daily = repo.stats_daily("u1", "2025-01-01T00:00:00+00:00")
+    assert [(d["date"], d["sessions"]) for d in daily] == [
+        ("2025-01-05", 2),
+        ("2025-01-07", 1),
+    ]
+    assert repo.stats_overview("u1", "2025-01-06T00:00:00Z")["total_sessions"] == 1
+
+
+def test_runner_code_collision_retries_with_a_new_code(monkeypatch):
+    import runtrack.repository as repository
+
+    codes = iter([42, 42, 43])
+    monkeypatch.setattr(repository.random, "randint", lambda a, b: next(codes))
+
+    first = services.register_user("first", "abcd1234", "runner")
+    second = services.register_user("second", "abcd1234", "runner")
+    assert (first["runner_code"], second["runner_code"]) == (42, 43)
+
+    with pytest.raises(ValueError):
+        services.register_user("first", "abcd1234", "runner")
+
+
+def test_recent_runs_skip_metric_rows(runner_user):
+    user, _ = runner_user
+    services.start_run(user["id"])
+    services.add_metric(user_id=user["id"], distance_km=1.5, duration_seconds=450)
+
+    raw = services.repo.fetch_history_by_user_id(user["id"], 5, include_metrics=False)
+    assert raw["sessions"][0]["metrics"] == []
+
+    recent = services.get_recent_runs(user["id"], 5)
+    assert recent["count"] == 1
+    assert recent["sessions"][0]["total_distance_km"] == 1.5
+
+
+def test_only_strava_stats_exclude_manual_sessions(runner_user):
+    user, _ = runner_user
+    _import_strava_run(user["id"])
+    services.repo.create_session_from_import(
+        user_id=user["id"],
+        started_at_iso="2025-01-05T18:00:00Z",
+        duration_seconds=300,
+        distance_km=1.0,
+        calories_per_hour=600.0,
+        note="manual entry",
+    )
+    since = "2025-01-01T00:00:00Z"
+
+    daily = services.repo.stats_daily(user["id"], since, only_strava=True)
+    assert [(d["date"], d["sessions"]) for d in daily] == [("2025-01-05", 1)]
+    assert services.repo.stats_daily(user["id"], since)[0]["sessions"] == 2
+
+    sessions = services.repo.fetch_sessions_between(
+        user["id"], since, "2025-02-01T00:00:00Z", only_strava=True
+    )
+    assert [s["note"] for s in sessions] == ["Imported from Strava #101"]
+
+
+def test_list_sessions_summary_pages_newest_first(runner_user):
+    user, _ = runner_user
+    for day in (3, 1, 2):
+        services.repo.create_session_from_import(
+            user_id=user["id"],
+            started_at_iso=f"2025-01-0{day}T07:00:00Z",
+            duration_seconds=600,
+            distance_km=float(day),
+            calories_per_hour=600.0,
+        )
+
+    first = services.repo.list_sessions_summary(user["id"], 2)
+    rest = services.repo.list_sessions_summary(user["id"], 2, offset=2)
+    assert [s["total_distance_km"] for s in first + rest] == [3.0, 2.0, 1.0]
+    assert "metrics" not in first[0]
+
+
+def test_file_repo_reads_through_query_only_pool(tmp_path):
+    repo = Repo(db_path=str(tmp_path / "pool.db"))
+    user = repo.create_user("pooled", "runner", "hash")
+
+    assert repo.get_user_by_id(user["id"])["username"] == "pooled"
+    plan = repo.create_daily_plan(user["id"], "2025-02-03", "07:00", 30, 5.0, None)
+    assert repo.list_daily_plans_for_date(user["id"], "2025-02-03") == [plan]
+
+    with repo._read_conn() as conn:
+        assert conn is not repo.conn
+        with pytest.raises(sqlite3.OperationalError):
+            conn.execute("DELETE FROM users")
+    with repo._read_conn() as again:
+        assert again is conn
+
+
+def test_user_lookups_are_cached_and_bounded(runner_user, monkeypatch):
+    import runtrack.repository as repository
+
+    user, _ = runner_user
+    first = services.repo.get_user_by_id(user["id"])
+    first["username"] = "mutated"
+    assert services.repo.get_user_by_id(user["id"])["username"] == "runner1"
+    assert services.repo.get_user_by_id("missing") is None
+
+    monkeypatch.setattr(repository, "_USER_CACHE_MAX", 1)
+    other = services.register_user("runner2", "abcd1234", "runner")
+    services.repo.get_user_by_id(other["id"])
+    assert list(services.repo._user_cache) == [other["id"]]
+
+
+def test_db_maintenance_truncates_wal(tmp_path, monkeypatch):
+    repo = Repo(db_path=str(tmp_path / "wal.db"))
+    monkeypatch.setattr(services, "repo", repo)
+    services.register_user("runner3", "abcd1234", "runner")
+
+    services.run_db_maintenance()
+    assert (tmp_path / "wal.db-wal").stat().st_size == 0
+
+
+def test_strava_sync_writes_a_page_of_runs_in_one_batch(runner_user, monkeypatch):
+    user, _ = runner_user
+    services.repo.upsert_strava_credentials(
+        user["id"], 42, "access", "refresh", 2**31, "activity:read"
+    )
+    run = {"sport_type": "Run", "moving_time": 600, "distance": 2000.0}
+    activities = [
+        dict(run, id=1, start_date="2025-01-05T07:00:00Z"),
+        dict(run, id=2, start_date="2025-01-06T07:00:00Z"),
+        dict(run, id=2, start_date="2025-01-06T07:00:00Z"),
+        dict(run, id=3, sport_type="Ride", start_date="2025-01-07T07:00:00Z"),
+    ]
+
+    class FakeClient:
+        def list_activities(self, **kwargs):
+            return activities if kwargs["page"] == 1 else []
+
+    monkeypatch.setattr(services, "_get_strava_client", lambda: FakeClient())
+    batches = []
+    bulk = services.repo.record_strava_activity_imports_bulk
+    monkeypatch.setattr(
+        services.repo,
+        "record_strava_activity_imports_bulk",
+        lambda uid, items: batches.append(len(items)) or bulk(uid, items),
+    )
+
+    result = services.strava_sync_runner(user["id"])
+    assert (result["imported_sessions"], result["skipped_activities"]) == (2, 2)
+    assert batches == [2]
+    assert services.repo.has_imported_strava_activity(user["id"], 2)
+    assert len(services.repo.fetch_recent_strava_runs(user["id"], 10)) == 2
+
+    again = services.strava_sync_runner(user["id"], after_ts=0)
+    assert (again["imported_sessions"], again["skipped_activities"]) == (0, 4)
+    assert len(services.repo.fetch_recent_strava_runs(user["id"], 10)) == 2
+
+
+def test_bulk_strava_import_skips_conflicting_activities(runner_user):
+    user, _ = runner_user
+    item = {
+        "activity_id": 7,
+        "started_at_iso": "2025-01-05T07:00:00Z",
+        "duration_seconds": 600,
+        "distance_km": 2.0,
+        "calories_per_hour": 600.0,
+    }
+    repo = services.repo
+    assert repo.record_strava_activity_imports_bulk(user["id"], [item]) == 1
+
+    # Already imported, and repeated within the batch: neither is an error
+    other = dict(item, activity_id=8)
+    assert repo.record_strava_activity_imports_bulk(user["id"], [item, other, other]) == 1
+
+    sessions = repo.conn.execute(
+        "SELECT COUNT(*) FROM sessions WHERE user_id=?", (user["id"],)
+    ).fetchone()[0]
+    assert sessions == 2
+    assert len(repo.fetch_recent_strava_runs(user["id"], 10)) == 2
+
+
+def test_runner_code_falls_back_to_a_free_code_when_draws_keep_colliding(monkeypatch):
+    import runtrack.repository as repository
+
+    monkeypatch.setattr(repository, "_RUNNER_CODE_MAX", 3)
+    monkeypatch.setattr(repository.random, "randint", lambda a, b: 1)
+
+    codes = [
+        services.register_user(f"runner{i}", "abcd1234", "runner")["runner_code"]
+        for i in range(3)
+    ]
+    assert sorted(codes) == [1, 2, 3]
+    with pytest.raises(ValueError):
+        services.register_user("runner9", "abcd1234", "runner")
+
+
+@pytest.mark.parametrize("has_returning", [True, False])
+def test_week_plan_rule_upsert_returns_the_stored_row(runner_user, monkeypatch, has_returning):
+    import runtrack.repository as repository
+
+    monkeypatch.setattr(repository, "_HAS_RETURNING", has_returning)
+    user, _ = runner_user
+    first = services.set_week_plan_rule(user["id"], 1, "07:00", 30, 5.0)
+    second = services.set_week_plan_rule(user["id"], 3, "18:30", 45, 8.0)
+
+    assert second["id"] == first["id"]
+    assert (second["weekday"], second["start_time"], second["distance_km"]) == (3, "18:30", 8.0)
+    assert services.get_week_plan_rule(user["id"])["weekday"] == 3
+
+
+def test_recent_strava_runs_read_cadence_without_the_payload(runner_user):
+    user, _ = runner_user
+    _import_strava_run(user["id"], activity_id=101, payload={"average_cadence": 172.5})
+    _import_strava_run(user["id"], activity_id=102)
+
+    runs = services.get_recent_strava_runs(user["id"], limit=5)
+    assert sorted((r["strava_activity_id"], r["cadence"]) for r in runs) == [
+        (101, 172.5),
+        (102, None),
+    ]
+
+
+def test_time_of_day_and_training_load_read_the_written_local_time(runner_user):
+    user, _ = runner_user
+    services.repo.record_strava_activity_imports_bulk(
+        user["id"],
+        [
+            {
+                "activity_id": 201,
+                "started_at_iso": "2025-01-05T07:15:00Z",
+                "duration_seconds": 1800,
+                "distance_km": 5.0,
+                "calories_per_hour": 600.0,
+            },
+            {
+                "activity_id": 202,
+                "started_at_iso": "2025-01-06T19:45:00+01:00",
+                "duration_seconds": 1200,
+                "distance_km": 3.0,
+                "calories_per_hour": 600.0,
+            },
+        ],
+    )
+
+    slots = {
+        s["slot"]: s["sessions"]
+        for s in services.get_stats_time_of_day(user["id"], 3650)["time_of_day_distribution"]
+    }
+    assert (slots["morning"], slots["evening"]) == (1, 1)
+
+    weeks = services.get_stats_training_load(user["id"], 520)["weeks"]
+    assert [(w["week_label"], w["week_start"]) for w in weeks] == [
+        ("2025-W01", "2024-12-30"),
+        ("2025-W02", "2025-01-06"),
+    ]
+
+
+def test_dashboard_from_one_read_matches_the_individual_stats(runner_user, monkeypatch):
+    from datetime import datetime, timedelta, timezone
+
+    user, _ = runner_user
+    now = datetime.now(timezone.utc)
+    services.repo.record_strava_activity_imports_bulk(
+        user["id"],
+        [
+            {
+                "activity_id": 300 + i,
+                "started_at_iso": (now - timedelta(days=ago, hours=ago)).strftime(
+                    "%Y-%m-%dT%H:%M:%SZ"
+                ),
+                "duration_seconds": 600 + ago,
+                "distance_km": 1.0 + ago / 10,
+                "calories_per_hour": 600.0,
+            }
+            for i, ago in enumerate((0, 1, 1, 5, 12, 20, 40))
+        ],
+    )
+
+    calls = []
+    read = services.repo.stats_sessions_since
+    monkeypatch.setattr(
+        services.repo,
+        "stats_sessions_since",
+        lambda *a, **kw: calls.append(a) or read(*a, **kw),
+    )
+    dashboard = services._build_dashboard(user["id"], 7, 4)
+    assert len(calls) == 1
+
+    assert dashboard["overview"] == services.get_stats_overview(user["id"], 7)
+    assert dashboard["daily"] == services.get_stats_daily(user["id"], 7)
+    assert dashboard["time_of_day"] == services.get_stats_time_of_day(user["id"], 7)
+    assert dashboard["training_load"] == services.get_stats_training_load(user["id"], 4)
+    assert dashboard["overview"]["total_sessions"] == 4
+
+
+def test_iso_to_datetime_accepts_z_suffix_and_offsets():
+    z = services._iso_to_datetime("2024-05-01T06:30:00Z")
+    assert z == services._iso_to_datetime("2024-05-01T06:30:00+00:00")
+    assert z.utcoffset().total_seconds() == 0
+    assert services._iso_to_datetime("2024-05-01T06:30:00Z") is z
+
+
+def test_weekly_batch_plans_validate_without_a_throwaway_plan(runner_user, monkeypatch):
+    user, _ = runner_user
+    deleted = []
+    monkeypatch.setattr(services.repo, "delete_daily_plan", lambda *a: deleted.append(a))
+
+    result = services.create_weekly_batch_plans(user["id"], 2024, 5, 0, "07:00", 30, 5.0)
+    assert result["count"] == 4
+    assert [p["plan_date"] for p in result["created"]] == [
+        "2024-05-06", "2024-05-13", "2024-05-20", "2024-05-27",
+    ]
+    assert deleted == []
+    assert services.list_day_plans_for_date(user["id"], "2024-05-01") == []
+    assert services.list_day_plans_for_date(user["id"], "2024-05-13") == [result["created"][1]]
+
+    with pytest.raises(ValueError, match="start_time"):
+        services.create_weekly_batch_plans(user["id"], 2024, 5, 0, "25:00", 30, 5.0)
+
+
+def test_history_summary_matches_full_history_stats(runner_user):
+    user, _ = runner_user
+    for activity_id in (501, 502, 503):
+        _import_strava_run(user["id"], activity_id=activity_id)
+
+    for limit in (2, 50):
+        summary = services._history_summary_json(user["id"], limit)
+        full = services.build_history_json(user["id"], limit)
+        assert summary == {"user": full["user"], "overall_stats": full["overall_stats"]}
+    assert services._history_summary_json("0" * 32, 5)["user"] is None
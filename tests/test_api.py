@@ -0,0 +1,40 @@
+import sys
+from pathlib import Path
+import unittest
+
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from runtrack.api import _has_valid_signature, _sign_weekly_template, app  # noqa: E402
+
+
+class TestWeeklyTemplateSignature(unittest.TestCase):
+    def test_signature_survives_json_number_round_trip(self):
+        template = [{"weekday": 0, "activities": [
+            {"start_time": "07:00", "duration_minutes": 30, "distance_km": 5.0,
+             "activity": "easy run", "description": None},
+        ]}]
+        signature = _sign_weekly_template(template)
+
+        # The browser sends 5.0 back as 5
+        echoed = [{"weekday": 0, "activities": [
+            {"description": None, "activity": "easy run", "distance_km": 5,
+             "duration_minutes": 30, "start_time": "07:00"},
+        ]}]
+        self.assertTrue(_has_valid_signature({"weekly_template": echoed, "signature": signature}))
+
+        echoed[0]["activities"][0]["distance_km"] = 5.5
+        self.assertFalse(_has_valid_signature({"weekly_template": echoed, "signature": signature}))
+
+    def test_apply_route_documents_its_body(self):
+        operation = app.openapi()["paths"]["/api/running_plan/ai/apply/{user_id}"]["post"]
+        schema = operation["requestBody"]["content"]["application/json"]["schema"]
+
+        self.assertIn("weekly_template", schema["properties"])
+        self.assertNotIn("$ref", str(schema))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -61,6 +61,12 @@ class TestCoachFactory(unittest.TestCase):
 
         self.assertIsInstance(session, coachSession)
 
+    def test_coach_session_factory_issues_unique_session_ids(self):
+        session_factory = CoachSessionFactory()
+        ids = {session_factory.create_session().sessionId for _ in range(100)}
+
+        self.assertEqual(len(ids), 100)
+
     def test_factory_coach_initial_session_history_empty(self):
         factory = UserFactory()
         user = factory.create_user("coach", "Jess")